@@ -1,8 +1,13 @@
+import os
+from typing import List
 import typer
 from src.data.analysis import run_analysis
-from src.data.gen_buckets import gen_buckets
+from src.data.gen_buckets import PROCESSORS, SEED, TASKS_PER_BUCKET, gen_buckets
 from src.data.gen_results import gen_results
-from src.samples import tables
+from src.data.result_cache import CACHE_PATH, ResultCache
+from src.data.store import BucketStore, convert_buckets, convert_results
+from src.entropy.case_gen import period_choices
+from src.samples import benchmark, tables
 import src.samples.reorder as reorder
 import logging
 import simsogui
@@ -21,20 +26,42 @@ def run_sample(
     if name == "tables":
         print("Running tables")
         tables.entrypoint()
+    if name == "benchmark":
+        benchmark.entrypoint(processors)
 
 
 
 @app.command()
-def generate_results(file_path: str = typer.Option("buckets.json", "--file-path", "-f")):
+def generate_results(
+    file_path: str = typer.Option("buckets", "--file-path", "-f"),
+    adaptive: bool = typer.Option(False, "--adaptive", "-a", help="Stop each simulation once its entropy converges"),
+    replay: bool = typer.Option(False, "--replay", "-r", help="Simulate deterministic schedules for two hyperperiods and replicate them"),
+    cache_path: str = typer.Option(CACHE_PATH, "--cache", "-c", help="File of the cache of simulation results"),
+    no_cache: bool = typer.Option(False, "--no-cache", help="Simulate everything without using the cache"),
+    cells: List[str] = typer.Option(None, "--cell", help="Only run a PROCESSORS:BUCKET cell of the grid, can be repeated"),
+    entropy2: bool = typer.Option(False, "--entropy2", help="Also measure the REORDER entropy, records the whole schedule"),
+):
     """
     Generates results given a file path with the buckets.
-    It will generate a file `{file}_partial.json` with partial results so computation can be resumed if needed.
-    The final file will be named `{file}_results.json`
+    It will generate a directory `{file}_partial` with partial results so computation can be resumed if needed.
+    The final results will be stored in `{file}_results`
     """
-    gen_results(file_path)
+    parsed_cells = [tuple(int(x) for x in cell.split(":")) for cell in cells] if cells else None
+    gen_results(file_path, adaptive, replay, None if no_cache else cache_path, parsed_cells, entropy2)  # type: ignore
 
 @app.command()
-def read_results(file_path: str = typer.Option("buckets_results.json", "--file-path", "-f")):
+def invalidate_cache(
+    scheduler: str = typer.Option(None, "--scheduler", "-s", help="Only invalidate the results of this scheduler"),
+    cache_path: str = typer.Option(CACHE_PATH, "--cache", "-c"),
+):
+    """
+    Removes results from the simulation cache, all of them unless a scheduler is given.
+    """
+    removed = ResultCache(cache_path).invalidate(scheduler)
+    print("Removed", removed, "cached results")
+
+@app.command()
+def read_results(file_path: str = typer.Option("buckets_results", "--file-path", "-f")):
     """
     Reads the results from a file and prints them.
     """
@@ -42,8 +69,37 @@ def read_results(file_path: str = typer.Option("buckets_results.json", "--file-p
 
 
 @app.command()
-def generate_buckets(file_path: str = typer.Option("buckets.json", "--file-path", "-f")):
-    gen_buckets(file_path)
+def generate_buckets(
+    file_path: str = typer.Option("buckets", "--file-path", "-f"),
+    seed: int = typer.Option(SEED, "--seed", "-s", help="Master seed, the same seed generates the same buckets"),
+    processes: int = typer.Option(None, "--processes", "-p", help="Processes generating tasksets, all cores by default"),
+    processors: List[int] = typer.Option(PROCESSORS, "--processors", "-P", help="Processor counts, can be repeated"),
+    buckets: int = typer.Option(10, "--buckets", "-b", help="Amount of utilization buckets"),
+    tasks_per_bucket: int = typer.Option(TASKS_PER_BUCKET, "--tasks-per-bucket", "-t"),
+    periods: List[int] = typer.Option(period_choices, "--period", help="Periods to choose from, can be repeated"),
+):
+    """
+    Generates the tasksets of the experiment grid, the grid is stored with them for the rest of the commands.
+    """
+    gen_buckets(file_path, seed, processes, processors, buckets, tasks_per_bucket, periods)
+
+@app.command()
+def convert(
+    file_path: str = typer.Argument(..., help="Bucket or result file written by an older version"),
+    output: str = typer.Option(None, "--output", "-o", help="Store to create, defaults to the file name without extension"),
+    buckets: str = typer.Option("buckets", "--buckets", "-b", help="Converted bucket store the results were generated from"),
+):
+    """
+    Converts the `str()` bucket and result files of older versions into stores.
+    """
+    output = output or os.path.splitext(file_path)[0]
+    with open(file_path, "r") as f:
+        is_results = f.read(1) == "{"
+    if is_results:
+        convert_results(file_path, output, BucketStore(buckets))
+    else:
+        convert_buckets(file_path, output, PROCESSORS, period_choices)
+    print("Converted", file_path, "into", output)
 
 @app.command()
 def gui():
@@ -1,36 +1,35 @@
 from collections import defaultdict
 from typing import Any
 
-from src.data.gen_buckets import PROCESSORS, TASKS_PER_BUCKET
 from src.data.gen_results import scheduler_names
+from src.data.store import ResultStore
 import matplotlib.pyplot as plt
 import numpy as np
 
 def run_analysis(file: str):
-    data = None
-    with open(file, "r") as f:
-        data = eval(f.read())
-    assert data is not None, "Data is None"
+    data = ResultStore(file).load()
+    grid = data["grid"]
 
     print(data["missed"])
     for k, v in data["missed"].items():
-        print(f"{k} missed {v} out of {TASKS_PER_BUCKET * 10 * len(PROCESSORS)} tests")
+        print(f"{k} missed {v} out of {grid['tasks_per_bucket'] * grid['buckets'] * len(grid['processors'])} tests")
     total_cnt = 0
     scheds = scheduler_names()
 
-    for p in PROCESSORS:
+    for p in grid["processors"]:
         print("-"*50)
         print(p, "processors")
-        for i in range(10):
-            print(f"{i*10}% -> {(i+1)*10}%")
+        for i in range(grid["buckets"]):
+            print(bucket_label(i, grid["buckets"]))
             cnts = [0 for _ in range(len(scheds))]
             for s in range(len(scheds)):
                 cnt = len(data["data"][scheds[s]][p][i])
                 cnts[s] = cnt
-            cnt = cnts[0]
+            cnt = max(cnts)
             total_cnt += cnt
-            for c in cnts:
-                assert c == cnt, f"Lengths don't match {cnts}"
+            if any(c != cnt for c in cnts):
+                # results saved before a timeout dropped the whole test
+                print("Lengths don't match", dict(zip(scheds, cnts)))
 
             if cnt == 0:
                 print("No data")
@@ -42,31 +41,62 @@ def run_analysis(file: str):
                 entropymax = 0
                 entropymin = int(1e9)
                 sched_cnt = len(data["data"][s][p][i])
+                if sched_cnt == 0:
+                    output += f" | {s} no data"
+                    continue
                 for test in data["data"][s][p][i]:
                     entropy += test["entropy"] / sched_cnt
                     entropymax = max(entropymax, test["entropy"])
                     entropymin = min(entropymin, test["entropy"])
-                output += f" | {s} {entropy/sched_cnt} ({entropymin}, {entropymax})"
+                # results generated before entropy2 joined the pipeline or without it don't have it
+                entropies2 = [test["entropy2"] for test in data["data"][s][p][i] if "entropy2" in test]
+                entropy2 = sum(entropies2) / len(entropies2) if entropies2 else "n/a"
+                output += f" | {s} {entropy/sched_cnt} ({entropymin}, {entropymax}) entropy2 {entropy2}"
 
-            print(f"{i*10}% -> {(i+1)*10}%")
+            print(bucket_label(i, grid["buckets"]))
             print(output)
     print("-"*50)
     print(total_cnt, "total tests")
+    print_convergence(data)
     print("generating plots...")
     boxplot_avg_entropy_by_utilization_bucket(data)
     # scatter_entropy_by_utilization(data)
     print("done")
 
+def bucket_label(i, buckets):
+    return f"{i*100/buckets:g}% -> {(i+1)*100/buckets:g}%"
+
+def print_convergence(data):
+    """
+    Prints the average entropy of each scheduler for every (hyperperiod amount, hyperperiod length) resolution
+    that was measured, to check how the entropy converges with the amount of hyperperiods.
+    """
+    for s in scheduler_names():
+        for p in data["grid"]["processors"]:
+            resolutions = defaultdict(list)
+            for i in range(data["grid"]["buckets"]):
+                for test in data["data"][s][p][i]:
+                    for k, l, entropy in test.get("resolutions", []):
+                        if entropy is not None:
+                            resolutions[(k, l)].append(entropy)
+            if not resolutions:
+                continue
+            output = f"{s} {p} processors"
+            for (k, l), entropies in sorted(resolutions.items(), key=lambda x: (x[0][1], x[0][0])):
+                output += f" | {k}x{l}ms {sum(entropies) / len(entropies)}"
+            print(output)
+
 def boxplot_avg_entropy_by_utilization_bucket(data):
     """
     Creates a boxplot of the entropy by utilization bucket with all schedulers having boxes together for each bucket
     Saves the result in results/avg_entropy_by_utilization_bucket_{processor_count}.png
     """
     scheds = scheduler_names()
-    for p in PROCESSORS:
+    buckets = data["grid"]["buckets"]
+    for p in data["grid"]["processors"]:
         gdata = {}
-        for i in range(10):
-            key = f"[0.{i}, {(i+1)//10}.{(i+1)%10}]"
+        for i in range(buckets):
+            key = f"[{round(i/buckets, 3)}, {round((i+1)/buckets, 3)}]"
             entropy_reorder = []
             entropy_run = []
             entropy_edf = []
@@ -125,14 +155,14 @@ def scatter_entropy_by_utilization(data):
     Saves the result in results/entropy_by_utilization_{scheduler}_{processor_count}.png
     """
     scheds = scheduler_names()
-    for p in PROCESSORS:
+    for p in data["grid"]["processors"]:
         task_count_min = int(1e9)
         task_count_max = 0
         entropy_max = 0
         entropy_min = int(1e9)
         gdata = defaultdict(list)
         for s in scheds:
-            for i in range(10):
+            for i in range(data["grid"]["buckets"]):
                 sched_cnt = len(data["data"][s][p][i])
                 for test in data["data"][s][p][i]:
                     task_count_min = min(task_count_min, len(test["test"]))
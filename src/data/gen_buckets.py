@@ -1,37 +1,109 @@
 import random
+from multiprocessing import Pool
+from typing import List, Optional, Tuple
 
-from ..entropy.case_gen import gen_tasks
+import numpy as np
+
+from ..entropy.analysis import HYPERPERIOD_LEN
+from ..entropy.case_gen import gen_tasks_batch, lcmlist, period_choices, tasks_from_arrays
+from .store import BucketStore
 
 PROCESSORS = [8, 16, 32]
 TASKS_PER_BUCKET = 100
+# master seed, the same seed generates the same buckets whatever the amount of processes
+SEED = 0
+# most candidate tasksets drawn at once
+MAX_BATCH = 64
 
-def gen_buckets(file_path = None):
+def gen_buckets(
+    file_path: str,
+    seed: int = SEED,
+    processes: Optional[int] = None,
+    processors: List[int] = PROCESSORS,
+    buckets: int = 10,
+    tasks_per_bucket: int = TASKS_PER_BUCKET,
+    choices: List[int] = period_choices,
+) -> BucketStore:
     """
     Simulation Setup:
+    The tasksets are generated in shards, one per (processor count, taskset number) with a taskset for each
+    utilization bucket, in parallel. Every shard has its own seed derived from the master seed and the shards are
+    appended to the store in order as they finish.
+    The experiment grid is stored in the manifest of the store, the rest of the pipeline follows it.
     """
-    processor_buckets = []
-    for p in PROCESSORS:
-        print("Processing", p)
-        buckets = {i: [] for i in range(10)}
-        for am in range(1, TASKS_PER_BUCKET+1):
+    assert HYPERPERIOD_LEN % lcmlist(choices) == 0, f"Periods must divide the hyperperiod {HYPERPERIOD_LEN}"
+    grid = {
+        "processors": processors,
+        "buckets": buckets,
+        "tasks_per_bucket": tasks_per_bucket,
+        "period_choices": choices,
+        "seed": seed,
+    }
+    store = BucketStore.create(file_path, grid)
+    shards = [(p, am, grid) for p in processors for am in range(1, tasks_per_bucket+1)]
+    with Pool(processes) as pool:
+        for p, am, tasksets in pool.imap(gen_shard, shards):
+            if am == 1:
+                print("Processing", p)
             if am % 10 == 0:
                 print("Generated", am)
-            task_amount = random.randint(p + 2, 3 * p)
-            for i in range(10):
-                success = False
-                while not success:
-                    util = random.uniform(i/10 * p, (i+1)/10 * p)
-                    tasks = gen_tasks(task_amount, util)
-                    u = sum(task["wcet"] / task["period"] for task in tasks)
-                    assert i/10 * p <= u <= (i+1)/10 * p
-                    success = decreasing_first_fit_succeeds(tasks, p)
-                    if success:
-                        buckets[i].append(tasks)
-        processor_buckets.append(buckets)
-    if file_path:
-        with open(file_path, "w") as f:
-            f.write(str(processor_buckets))
-    return processor_buckets
+            store.extend(tasksets)
+    return store
+
+def shard_seeds(p: int, am: int, seed: int) -> Tuple[int, int]:
+    """
+    Seeds of `random` and `numpy.random` for a shard.
+    """
+    state = np.random.SeedSequence([seed, p, am]).generate_state(2)
+    return int(state[0]), int(state[1])
+
+def gen_shard(shard) -> Tuple[int, int, List[Tuple[int, int, List[dict]]]]:
+    p, am, grid = shard
+    random_seed, numpy_seed = shard_seeds(p, am, grid["seed"])
+    random.seed(random_seed)
+    np.random.seed(numpy_seed)
+
+    tasksets = []
+    task_amount = random.randint(p + 2, 3 * p)
+    b = grid["buckets"]
+    for i in range(b):
+        # candidates are drawn in batches, growing while they keep being rejected
+        batch = 1
+        success = False
+        while not success:
+            utils = np.random.uniform(i/b * p, (i+1)/b * p, size=batch)
+            periods, wcets = gen_tasks_batch(task_amount, utils, grid["period_choices"])
+            fits = decreasing_first_fit_succeeds_batch(periods, wcets, p)
+            success = bool(fits.any())
+            if success:
+                # the first one that fits, as if they had been drawn one by one
+                tasks = tasks_from_arrays(*(a[np.argmax(fits)] for a in (periods, wcets)))
+                u = sum(task["wcet"] / task["period"] for task in tasks)
+                assert i/b * p <= u <= (i+1)/b * p
+                tasksets.append((p, i, tasks))
+            batch = min(2 * batch, MAX_BATCH)
+    return p, am, tasksets
+
+def decreasing_first_fit_succeeds_batch(periods: np.ndarray, wcets: np.ndarray, p: int) -> np.ndarray:
+    """
+    `decreasing_first_fit_succeeds` for a batch of tasksets given as (periods, wcets) arrays of shape (batch, n),
+    every step places a task of all the tasksets at once.
+    """
+    batch, n = periods.shape
+    order = np.argsort(-(wcets / periods), axis=1, kind="stable")
+    periods = np.take_along_axis(periods, order, axis=1)
+    wcets = np.take_along_axis(wcets, order, axis=1)
+    cpus = np.zeros((batch, p))
+    fits = np.ones(batch, dtype=bool)
+    sets = np.arange(batch)
+
+    for k in range(n):
+        period = periods[:, k, None]
+        fit = cpus * period + wcets[:, k, None] <= period
+        fits &= fit.any(axis=1)
+        j = np.argmax(fit, axis=1)
+        cpus[sets, j] += np.where(fits, wcets[:, k] / periods[:, k], 0)
+    return fits
 
 def decreasing_first_fit_succeeds(tasks, p):
     t = sorted(tasks, key=lambda x: x["wcet"] / x["period"], reverse=True)
@@ -45,4 +117,3 @@ def decreasing_first_fit_succeeds(tasks, p):
                 return False
         cpus[j] += task["wcet"] / task["period"]
     return True
-
@@ -1,144 +1,412 @@
 
+import contextlib
+import fcntl
+import json
 import os
-from typing import List, Tuple
-from multiprocessing import Queue, Process
-from src.data.gen_buckets import PROCESSORS
-from src.entropy.analysis import HYPERPERIOD_LEN, K, entropy
+import random
+import shutil
+import signal
+import time
+from collections import Counter, deque
+from typing import List, Optional, Tuple
+from multiprocessing import Pipe, Process
+from multiprocessing.connection import Connection, wait
+import numpy as np
+from simso.core.etm.WCET import WCET
+from src.entropy.case_gen import period_choices, resolutions
+from src.entropy.analysis import HYPERPERIOD_LEN, K, SlotFrequencies, entropy2_vectorized
+from src.data.store import BucketStore, ResultStore, taskset_id
+from src.data.result_cache import CACHE_PATH, ResultCache, analysis_source, cache_key, scheduler_source
+from src.schedulers.registry import DETERMINISTIC, SCHEDULERS
 from src.simso.model_builder import ACETModelBuilder
-from src.simso.sim_data import SimData
+from src.simso.entropy_accumulator import ConvergenceStop, EntropyAccumulator
+from src.simso.sim_data import into_array
 
 # my cpu core count
 THREAD_COUNT = 8
-
-def gen_results(file_path: str):
-    def process_job(task_queue: Queue, response_queue: Queue):
+# seconds a single test may run, enforced inside the worker with SIGALRM
+TEST_TIMEOUT = 300
+# seconds between watchdog checks, a worker still busy this long after its alarm is considered hung and restarted
+WATCHDOG_INTERVAL = 30
+# tests per worker whose jobs may wait for an idle worker, more than one so a worker done with its test finds a test
+# no other worker started (see `dispatch`)
+PENDING_TESTS = 2
+
+# master seed of the random schedulers, each test gets its own seed from it
+SEED = 0
+
+# adaptive mode: relative change of the entropy between two hyperperiods under which the simulation stops
+CONVERGENCE_TOLERANCE = 1e-3
+MIN_HYPERPERIODS = 10
+# taskset id -> frozen builder, see `base_builder`
+base_builders = {}
+# frozen builders kept by a worker: it only moves to another test once all the jobs of its current one were sent (see
+# `dispatch`), so the one of the current test is the only one it gets to reuse
+BASE_BUILDERS = 1
+
+def gen_results(file_path: str, adaptive=False, replay=False, cache_path: Optional[str] = CACHE_PATH,
+                cells: Optional[List[Tuple[int, int]]] = None, entropy2=False):
+    """
+    Simulates the tests of the bucket store with every scheduler.
+    With `entropy2` the REORDER entropy is also measured, it needs the whole schedule so the executions are recorded.
+    `cells` limits the run to some (processors, bucket) cells of the grid so they can be dispatched independently,
+    every cell has its own checkpoint log and the results are written once all the cells of the grid are done.
+    """
+    def process_job(connection: Connection):
+        signal.signal(signal.SIGALRM, raise_test_timeout)
+        cache = ResultCache(cache_path) if cache_path is not None else None
+        # each worker maps the bucket store itself, so only (processors, bucket, index) goes through the pipe
+        store = BucketStore(file_path)
         while True:
-            task = task_queue.get()
+            task = connection.recv()
             if task is None:
                 break
-            test, p, i = task
-
-            def inner(test, p, output):
-                test_output = run_test(test, p)
-                output.put((test_output, test))
-
-            output = Queue(1)
-            inner_p = Process(target=inner, args=(test, p, output))
-            inner_p.start()
-            inner_p.join(300)
-            if inner_p.is_alive():
-                print("Inner process timed out")
-                print("test index:", i)
-                inner_p.kill()
-                response_queue.put(((None, test), p, i))
+            p, i, index, job = task
+            test = store.taskset(store.rows(p, i)[index])
+
+            signal.alarm(TEST_TIMEOUT)
+            try:
+                job_output = run_job(
+                    test, p, job % len(scheds), adaptive, replay, cache, store.grid["period_choices"], entropy2
+                )
+            except TestTimeout:
+                print("Test timed out")
+                print("test index:", i, "scheduler:", scheds[job % len(scheds)])
+                job_output = None
+            finally:
+                signal.alarm(0)
+
+            connection.send((job_output, job))
+
+    def start_worker(w: int):
+        # a pipe per worker, so a worker killed while using it can't leave a shared queue locked or corrupted
+        connection, worker_connection = Pipe()
+        process = Process(target=process_job, args=(worker_connection,))
+        process.start()
+        worker_connection.close()
+        workers[w] = (process, connection)
+
+    def receive(w: int):
+        """
+        Reads the result of the job of the w-th worker, None if it died before sending it.
+        """
+        try:
+            return workers[w][1].recv()
+        except (EOFError, OSError):
+            workers[w][0].join()
+            return None
+
+    def restart_worker(w: int):
+        process, connection = workers[w]
+        process.kill()
+        process.join()
+        connection.close()
+        start_worker(w)
+        # its frozen builder is gone, another worker can take the rest of its test
+        owners.pop(tests[w], None)
+        tests[w] = None
+        task = running[w]
+        running[w] = None
+        return task
+
+    def next_task(w: int):
+        """
+        Takes the pending job for the w-th worker: one of the test it's running if any, so its frozen builder is
+        reused, else one of a test no worker started, else the oldest one.
+        """
+        fresh = None
+        for k, task in enumerate(pending):
+            idx = task[3] // len(scheds)
+            if idx == tests[w]:
+                break
+            if fresh is None and idx not in owners:
+                fresh = k
+        else:
+            k = fresh if fresh is not None else 0
+        task = pending[k]
+        del pending[k]
+        tests[w] = task[3] // len(scheds)
+        owners.setdefault(tests[w], w)
+        return task
+
+    def dispatch():
+        """
+        Sends the pending jobs to the idle workers, a job stays in `running` until its result is read.
+        """
+        for w, (_, connection) in enumerate(workers):
+            if running[w] is None and pending:
+                task = next_task(w)
+                running[w] = (task, time.time())
+                try:
+                    connection.send(task)
+                except OSError:
+                    # the worker died, `check_workers` sends the job again
+                    pass
+
+    def check_workers():
+        """
+        Restarts the workers that died or hang past the alarm. The job of a hung worker is reported as timed out, the
+        one of a dead worker is sent again once and reported as timed out if its worker dies again.
+        Returns the result to report, if any.
+        """
+        for w, (process, connection) in enumerate(workers):
+            hanging = running[w] is not None and time.time() - running[w][1] > TEST_TIMEOUT + WATCHDOG_INTERVAL
+            if process.is_alive() and not hanging:
                 continue
-            test_output = output.get()
-            response_queue.put((test_output, p, i))
-
-
-    def save_partial_results(partial_result, name):
-        with open(f"{name}_partial.json", "w") as f:
-            f.write(str(partial_result))
-            print()
-            print("Saved partial results")
-
-    input, partial_result = setup(file_path)
+            # a worker may die right after sending its result
+            result = receive(w) if running[w] is not None and not hanging and connection.poll() else None
+            print("Worker", w, "stopped responding, restarting it")
+            task = restart_worker(w)
+            if result is not None:
+                return result
+            if task is None:
+                continue
+            task, _ = task
+            job = task[3]
+            if not hanging and job not in retried:
+                retried.add(job)
+                pending.appendleft(task)
+                continue
+            return None, job
+        return None
+
+    def next_result():
+        """
+        Waits for the next job result, the workers are checked every time a result arrives or a worker dies, and at
+        least every `WATCHDOG_INTERVAL` seconds.
+        """
+        while True:
+            dispatch()
+            result = check_workers()
+            if result is not None:
+                return result
+            busy = [w for w in range(THREAD_COUNT) if running[w] is not None]
+            ready = wait(
+                [workers[w][1] for w in busy] + [workers[w][0].sentinel for w in range(THREAD_COUNT)],
+                timeout=WATCHDOG_INTERVAL,
+            )
+            for w in busy:
+                if workers[w][1] in ready:
+                    result = receive(w)
+                    if result is not None:
+                        running[w] = None
+                        return result
+
+    def collect_result():
+        """
+        Waits for one job, once all the schedulers of its test are done merges them into the partial result.
+        """
+        nonlocal tasks_processing
+        job_output, job = next_result()
+        idx, s = divmod(job, len(scheds))
+        row, p, i, _, outputs = in_flight[idx]
+        outputs[s] = job_output
+        if len(outputs) == len(scheds):
+            in_flight.pop(idx)
+            owners.pop(idx, None)
+            output = merge_outputs(outputs)
+            handle_result((output, row), partial_result, p, i)
+            append_checkpoint(checkpoint(p, i), {"id": store.id(row), "p": p, "i": i, "output": output})
+            tasks_processing -= 1
+
+    def checkpoint(p, i):
+        if (p, i) not in checkpoints:
+            checkpoints[(p, i)] = open(checkpoint_path(file_path, p, i), "a")
+        return checkpoints[(p, i)]
+
+    store = BucketStore(file_path)
+    if cells is None:
+        cells = [(p, i) for p in store.processors for i in range(store.buckets)]
+    for p, i in cells:
+        assert p in store.processors and 0 <= i < store.buckets, f"Cell {p}:{i} is not in the grid"
+    _, partial_result, done = setup(file_path, cells)
+    if cache_path is not None:
+        print("Evicted", ResultCache(cache_path).evict(), "cached results")
+    scheds = scheduler_names()
 
     line_sep = "\n" + "-"*50
-    name = file_path.split(".")[:-1][0]
+    name = store_name(file_path)
 
+    os.makedirs(f"{name}_partial", exist_ok=True)
+    # (processors, bucket) -> checkpoint log of the cell
+    checkpoints = {}
     current_idx = 0
-    tests_ran_without_saving = 0
     tasks_processing = 0
-    task_queue = Queue(20)
-    response_queue = Queue(20)
-
-    processes = []
-    for _ in range(THREAD_COUNT):
-        p = Process(target=process_job, args=(task_queue, response_queue))
-        p.start()
-        processes.append(p)
-
-    for c, p in enumerate(PROCESSORS):
+    # (process, connection) of every worker
+    workers = [None] * THREAD_COUNT
+    # worker -> (task, when it was sent) of the job it is running, None if idle
+    running = [None] * THREAD_COUNT
+    # tasks waiting for an idle worker, the jobs of dead workers are sent again first
+    pending = deque()
+    # worker -> idx of the test of its last job, and idx -> worker that started the test
+    tests = [None] * THREAD_COUNT
+    owners = {}
+    # idx -> (taskset row, p, i, index in the cell, scheduler index -> output) of the tests sent to the workers
+    in_flight = {}
+    # jobs sent again after their worker died
+    retried = set()
+
+    for w in range(THREAD_COUNT):
+        start_worker(w)
+
+    for p in store.processors:
+        if all(cell[0] != p for cell in cells):
+            continue
         print(line_sep)
         print("Processing", p)
-        for i in range(10):
+        for i in range(store.buckets):
+            if (p, i) not in cells:
+                continue
             print(line_sep)
-            print("Current percentage", i*10, "->", (i+1)*10)
-            for test in input[c][i]:
-                if current_idx <= partial_result["idx"]:
-                    current_idx += 1
+            print("Current percentage", i*100//store.buckets, "->", (i+1)*100//store.buckets)
+            for index, row in enumerate(store.rows(p, i)):
+                if done[store.id(row)] > 0:
+                    done[store.id(row)] -= 1
                     continue
                 print("Current idx", current_idx, end="\r")
 
-                if task_queue.full():
-                    if tests_ran_without_saving >= THREAD_COUNT * 5:
-                        partial_result["idx"] = current_idx
-                        tests_ran_without_saving = 0
-                        # wait for all tasks so current_idx is correct.
-                        while tasks_processing > 0:
-                            test_output, x, y = response_queue.get()
-                            handle_result(test_output, partial_result, x, y)
-                            tasks_processing -= 1
-                        save_partial_results(partial_result, name)
-                    else:
-                        test_output, x, y = response_queue.get()
-                        handle_result(test_output, partial_result, x, y)
-                        tasks_processing -= 1
-
-                current_idx += 1
-                tests_ran_without_saving += 1
+                # one job per scheduler, so a slow scheduler doesn't hold back the others
+                in_flight[current_idx] = (row, p, i, index, {})
                 tasks_processing += 1
-                task_queue.put([test, p, i])
+                for s in range(len(scheds)):
+                    while len(pending) >= PENDING_TESTS * THREAD_COUNT * len(scheds):
+                        collect_result()
+                    pending.append((p, i, index, current_idx * len(scheds) + s))
+                current_idx += 1
 
     while tasks_processing > 0:
-        test_output, p, i = response_queue.get()
-        handle_result(test_output, partial_result, p, i)
-        tasks_processing -= 1
+        collect_result()
 
     print("Finished all tests, shutting down processes")
-    for _ in range(THREAD_COUNT):
-        task_queue.put(None)
-
-    for p in processes:
-        p.join()
-
-    print("All processes shut down, saving final results")
-
-    with open(f"{name}_results.json", "w") as f:
-        partial_result.pop("idx")
-        f.write(str(partial_result))
-    print("Saved final results")
-    os.remove(f"{name}_partial.json")
-
-
-def setup(file_path: str) -> Tuple[dict, dict]:
-    file_name = file_path.split(".")[:-1][0]
-    input = None
-    with open(file_path, "r") as f:
-        input = eval(f.read())
-    assert input is not None, "Input is None"
-    assert len(input) == len(PROCESSORS), "Input length is not as expected"
-
-    partial_result = default_partial_result()
-    try:
-        with open(f"{file_name}_partial.json", "r") as f:
-            partial_result = eval(f.read())
-    except FileNotFoundError:
+    for process, connection in workers:
+        connection.send(None)
+        process.join()
+        connection.close()
+
+    for f in checkpoints.values():
+        f.close()
+
+    # other dispatches may have finished their cells meanwhile, the logs have all of them, and one of them may be
+    # saving the results: the lock lets a single one save them
+    with results_lock(name):
+        if not os.path.isdir(f"{name}_partial"):
+            print("All processes shut down, the results were already saved by another run")
+            return
+        _, partial_result, done = setup(file_path, [])
+        if sum(done.values()) < len(store):
+            print("All processes shut down,", sum(done.values()), "of", len(store), "tests done,",
+                  "the results are saved once all the cells are done")
+            return
+
+        print("All processes shut down, saving final results")
+        save_results(f"{name}_results", partial_result, file_path)
+        print("Saved final results")
+        shutil.rmtree(f"{name}_partial", ignore_errors=True)
+
+
+class TestTimeout(Exception):
+    pass
+
+def raise_test_timeout(signum, frame):
+    raise TestTimeout()
+
+def store_name(file_path: str) -> str:
+    """
+    Name the files derived from a bucket store start with.
+    """
+    return os.path.splitext(os.path.normpath(file_path))[0]
+
+@contextlib.contextmanager
+def results_lock(name: str):
+    """
+    Exclusive lock on the final results of a store, the lock file is left behind and the lock is released if the
+    process dies.
+    """
+    with open(f"{name}_results.lock", "w") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+def save_results(path: str, partial_result: dict, file_path: str):
+    """
+    Writes the result store next to its final path and moves it there, so it's never seen half written.
+    """
+    temporary = f"{path}.tmp"
+    shutil.rmtree(temporary, ignore_errors=True)
+    ResultStore.write(temporary, partial_result, file_path)
+    shutil.rmtree(path, ignore_errors=True)
+    os.replace(temporary, path)
+
+def checkpoint_path(file_path: str, p: int, i: int) -> str:
+    return os.path.join(f"{store_name(file_path)}_partial", f"{p}_{i}.jsonl")
+
+def setup(file_path: str, cells: List[Tuple[int, int]]) -> Tuple[BucketStore, dict, Counter]:
+    """
+    Reads back the checkpoint logs of all the cells, the logs of `cells` are repaired before this run appends to them.
+    """
+    store = BucketStore(file_path)
+
+    partial_result = default_partial_result(store.processors, store.buckets)
+    # test id -> times it's done, a taskset repeated in the buckets is run as many times as it appears
+    done = Counter()
+    records = []
+    for p in store.processors:
+        for i in range(store.buckets):
+            try:
+                records += read_checkpoint(checkpoint_path(file_path, p, i), (p, i) in cells)
+            except FileNotFoundError:
+                pass
+    if not records:
         print("No partial results found, continuing from scratch")
-        pass
-
-    return input, partial_result
+        return store, partial_result, done
+
+    rows = {store.id(row): row for row in range(len(store))}
+    for record in records:
+        if record["id"] not in rows:
+            # the taskset was removed from the buckets
+            continue
+        handle_result((record["output"], rows[record["id"]]), partial_result, record["p"], record["i"])
+        done[record["id"]] += 1
+    print("Resuming with", sum(done.values()), "tests done")
+
+    return store, partial_result, done
+
+def append_checkpoint(f, record):
+    """
+    Appends a finished test to the checkpoint log, one JSON line written and flushed at once.
+    """
+    f.write(json.dumps(record) + "\n")
+    f.flush()
+    os.fsync(f.fileno())
+
+def read_checkpoint(path: str, repair=True) -> List[dict]:
+    """
+    Reads the records of the checkpoint log, a line left incomplete by a crash is ignored and, with `repair`, dropped
+    from the file so the following records are appended after the last complete one.
+    """
+    records = []
+    complete = 0
+    with open(path, "rb+" if repair else "rb") as f:
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                break
+            complete += len(line)
+        if repair:
+            f.truncate(complete)
+    return records
 
 def schedulers():
-    return [
-            {"clas": "simso.schedulers.P_EDF"},
-            {"clas": "simso.schedulers.RUN"},
-            {"filename": os.path.join(os.getcwd(), "src", "schedulers", "P_REORDER.py")},
-            {"filename": os.path.join(os.getcwd(), "src", "schedulers", "RUN_RANDOM.py")},
-    ]
+    return [{"clas": clas} for clas in SCHEDULERS.values()]
 
 def scheduler_name(s):
+    if isinstance(s.get("clas"), type):
+        return s["clas"].__name__
     if "clas" in s:
         return s["clas"].split(".")[-1]
     return s["filename"].split("/")[-1].split(".")[0]
@@ -150,30 +418,117 @@ def scheduler_names() -> List[str]:
         ans.append(scheduler_name(sched))
     return ans
 
-def run_test(test, processors):
-    results = []
-    for scheduler in schedulers():
-        entropy, _, error = run_scheduler(test, processors, scheduler)
-        if error is not None:
-            name = scheduler_name(scheduler)
-            print(name, "failed with error:", error)
-            return {"failed": name, "entropy": None}
-        results.append(entropy)
-
-    return {"entropy": results, "failed": None}
-
-def run_scheduler(test, processors, scheduler):
-    builder = ACETModelBuilder()
-    for _ in range(processors):
-        builder.add_cpu()
-
-    for task in test:
-        builder.add_task(**task)
-    builder.set_duration(HYPERPERIOD_LEN * K)
-
-    builder.set_scheduler(**scheduler)  # type: ignore
-
-    model = builder.build()
+def is_deterministic(scheduler, test):
+    """
+    True if the schedule can repeat every hyperperiod: the scheduler is in the `DETERMINISTIC` ones of the registry
+    and all tasks are released synchronously with periods that divide the hyperperiod.
+    Whether it does is only known once simulated, see `replay_scheduler`.
+    """
+    return scheduler.get("clas") in DETERMINISTIC and all(
+        task["activation_date"] == 0 and HYPERPERIOD_LEN % task["period"] == 0 for task in test
+    )
+
+def run_job(test, processors, s, adaptive=False, replay=False, cache=None, choices=period_choices, entropy2=False):
+    """
+    Runs the test with the s-th scheduler, one unit of work of `gen_results`.
+    """
+    scheduler = schedulers()[s]
+    result, _, error = run_scheduler(test, processors, scheduler, adaptive, replay, cache, choices=choices,
+                                     entropy2=entropy2)
+    if error is not None:
+        name = scheduler_name(scheduler)
+        print(name, "failed with error:", error)
+        return {"failed": name, "result": None}
+    return {"result": result, "failed": None}
+
+def merge_outputs(outputs):
+    """
+    Merges the job outputs of a test, by scheduler index, into the test output.
+    The test fails with the first scheduler that failed, a None output means the scheduler timed out and its result is
+    None, see `handle_result`.
+    """
+    scheds = scheduler_names()
+    merged = {"results": [], "failed": None, "timeouts": []}
+    for s, name in enumerate(scheds):
+        output = outputs[s]
+        if output is None:
+            merged["timeouts"].append(name)
+            merged["results"].append(None)
+        elif output["failed"] is not None:
+            return {"results": None, "failed": output["failed"], "timeouts": merged["timeouts"]}
+        else:
+            merged["results"].append(output["result"])
+    return merged
+
+def base_builder(test, processors) -> ACETModelBuilder:
+    """
+    Frozen builder with the CPUs and tasks of the test, the workers run the jobs of a test one after the other so the
+    builders of the last `BASE_BUILDERS` tests are kept.
+    """
+    key = taskset_id(test, processors)
+    if key not in base_builders:
+        if len(base_builders) >= BASE_BUILDERS:
+            base_builders.pop(next(iter(base_builders)))
+        builder = ACETModelBuilder()
+        builder.set_trace_only()
+        for _ in range(processors):
+            builder.add_cpu()
+
+        for task in test:
+            builder.add_task(**task)
+        base_builders[key] = builder.freeze()
+    return base_builders[key]
+
+def build_model(test, processors, scheduler, duration):
+    return base_builder(test, processors).clone(duration, **scheduler).build()
+
+def test_seed(test, processors, seed=SEED) -> int:
+    return (int(taskset_id(test, processors)[:16], 16) + seed) % 2**64
+
+def run_scheduler(test, processors, scheduler, adaptive=False, replay=False, cache: Optional[ResultCache] = None,
+                  seed=SEED, choices=period_choices, entropy2=False):
+    """
+    Simulates the test with the scheduler for K hyperperiods and measures its entropy.
+    In adaptive mode the simulation stops as soon as the entropy converges, "hyperperiods" in the result tells how
+    many were simulated.
+    In replay and adaptive modes deterministic schedules are simulated for two hyperperiods and replicated if they
+    repeat, see `replay_scheduler`.
+    The random schedulers are seeded from the test and `seed`, so with a cache the outcome is looked up before
+    simulating and stored after, the model is None when it comes from the cache.
+    The entropy is also measured with every hyperperiod length of `choices` the tasks fit in, see `resolutions`.
+    With `entropy2` the REORDER entropy is measured too, only then the executions are recorded and the dense schedule
+    is built.
+    """
+    key = None
+    if cache is not None:
+        parameters = [
+            K, HYPERPERIOD_LEN, seed, adaptive, replay, CONVERGENCE_TOLERANCE, MIN_HYPERPERIODS, choices, entropy2,
+            analysis_source(),
+        ]
+        key = cache_key(taskset_id(test, processors), scheduler_source(scheduler), parameters)
+        cached = cache.get(key)
+        if cached is not None:
+            return cached["result"], None, cached["error"]
+
+    random.seed(test_seed(test, processors, seed))
+    result, model, error = simulate_scheduler(test, processors, scheduler, adaptive, replay, choices, entropy2)
+    if key is not None:
+        cache.put(key, scheduler_name(scheduler), {"result": result, "error": error})  # type: ignore
+    return result, model, error
+
+def simulate_scheduler(test, processors, scheduler, adaptive=False, replay=False, choices=period_choices,
+                       entropy2=False):
+    if (replay or adaptive) and is_deterministic(scheduler, test):
+        replayed = replay_scheduler(test, processors, scheduler, choices, entropy2)
+        if replayed is not None:
+            return replayed
+
+    model = build_model(test, processors, scheduler, HYPERPERIOD_LEN * K)
+    accumulator = EntropyAccumulator(
+        model, len(test), record_executions=entropy2, resolutions=resolutions(test, choices)
+    )
+    if adaptive:
+        ConvergenceStop(accumulator, CONVERGENCE_TOLERANCE, MIN_HYPERPERIODS)
     try:
         model.run_model()
     except AssertionError as e:
@@ -182,42 +537,105 @@ def run_scheduler(test, processors, scheduler):
         else:
             raise e
 
-    if model.results.total_exceeded_count > 0: # type: ignore
-        return None, None, f"Missed deadlines: {model.results.total_exceeded_count}"  # type: ignore
+    if model.deadline_misses() > 0:
+        return None, None, f"Missed deadlines: {model.deadline_misses()}"
 
-    data = SimData(model)
-    hp = data.into_hyperperiods(HYPERPERIOD_LEN)
-    if hp is None:
+    scheduler_entropy = accumulator.entropy()
+    if scheduler_entropy is None:
         return None, None, "No hyperperiods found"
-    scheduler_entropy = entropy(hp, len(test), processors)
-    return scheduler_entropy, model, None # type: ignore
-
-def default_partial_result():
+    hyperperiods = accumulator.simulated_hyperperiods()
+    result = {
+        "entropy": scheduler_entropy,
+        # (hyperperiod_amount, hyperperiod_len, entropy)
+        "resolutions": [(k, l, e) for (k, l), e in accumulator.resolution_entropies().items()],
+        "hyperperiods": hyperperiods,
+    }
+    if entropy2:
+        schedule = into_array(accumulator.executions(), HYPERPERIOD_LEN, hyperperiods)
+        result["entropy2"] = entropy2_vectorized(schedule)  # type: ignore
+    return result, model, None # type: ignore
+
+def replay_scheduler(test, processors, scheduler, choices=period_choices, entropy2=False):
+    """
+    Simulates only two hyperperiods and, if the second one is an exact copy of the first with no missed deadlines
+    (every job released in the hyperperiod also finished in it, so the system is back to its initial state),
+    replicates the first one K times instead of simulating them.
+    Returns None when the schedule can't be replayed so the full simulation is run instead.
+    """
+    model = build_model(test, processors, scheduler, 2 * HYPERPERIOD_LEN)
+    if not isinstance(model.etm, WCET):
+        return None
+    accumulator = EntropyAccumulator(model, len(test), 2, record_executions=True)
+    try:
+        model.run_model()
+    except AssertionError:
+        return None
+    if model.deadline_misses() > 0:
+        return None
+
+    executions = accumulator.executions()
+    schedule = into_array(executions, HYPERPERIOD_LEN, 2)
+    if schedule is None or not (schedule[:, 0] == schedule[:, 1]).all():
+        return None
+
+    result = {
+        "entropy": replicated_entropy(executions, len(test), processors, K, HYPERPERIOD_LEN),
+        "resolutions": [
+            (k, l, replicated_entropy(executions, len(test), processors, k, l)) for k, l in resolutions(test, choices)
+        ],
+        "hyperperiods": 2,
+    }
+    if result["entropy"] is None:
+        return None
+    if entropy2:
+        result["entropy2"] = entropy2_vectorized(np.repeat(schedule[:, :1], K, axis=1))
+    return result, model, None
+
+def replicated_entropy(executions, task_amount, processors, hyperperiod_amount, hyperperiod_len):
+    """
+    Entropy of hyperperiod_amount hyperperiods of hyperperiod_len, built by repeating the first HYPERPERIOD_LEN ms
+    of the executions.
+    """
+    frequencies = SlotFrequencies(task_amount, processors, HYPERPERIOD_LEN // hyperperiod_len, hyperperiod_len)
+    for processor, processor_executions in enumerate(executions):
+        for start, end, task in processor_executions:
+            if start < HYPERPERIOD_LEN:
+                frequencies.add(processor, start, min(end, HYPERPERIOD_LEN), task)
+    frequencies = frequencies.replicate(hyperperiod_amount * hyperperiod_len // HYPERPERIOD_LEN)
+    if frequencies.all_empty():
+        return None
+    return frequencies.entropy()
+
+def default_partial_result(processors: List[int], buckets: int):
     return {
-        "idx": 0,
         "timeouts": [],
         "missed": {
             name: 0 for name in scheduler_names()
         },
         "data": {
-            name: {p: [[] for _ in range(10)] for p in PROCESSORS} for name in scheduler_names()
+            name: {p: [[] for _ in range(buckets)] for p in processors} for name in scheduler_names()
         },
     }
 
 def handle_result(test_output, partial_result, p, i):
-    output, test = test_output
-    if output is None:
-        partial_result["timeouts"].append((p, i, test))
-        return
+    """
+    Adds a test output to the partial result. A test with a scheduler that timed out is dropped for every scheduler,
+    so all of them have results for the same tests.
+    """
+    output, row = test_output
+    for name in output["timeouts"]:
+        partial_result["timeouts"].append((p, i, row, name))
     if output["failed"] is not None:
         partial_result["missed"][output["failed"]] += 1
         return
+    if None in output["results"]:
+        return
 
     s = scheduler_names()
-    for j, entropy in enumerate(output["entropy"]):
+    for j, result in enumerate(output["results"]):
         partial_result["data"][s[j]][p][i].append({
-            "entropy": entropy,
-            "test": test,
+            **result,
+            "taskset": row,
         })
 
 
@@ -0,0 +1,211 @@
+import ast
+import functools
+import hashlib
+import importlib.util
+import json
+import os
+import sqlite3
+import time
+from typing import List, Optional, Tuple
+
+# default location and size of the cache, the least recently used entries are evicted past the size
+CACHE_PATH = "results_cache.sqlite"
+CACHE_MAX_BYTES = 512 * 1024 * 1024
+# modules the outcome of a simulation depends on besides the scheduler: the model, the recorders, the measures and
+# the pipeline running them
+ANALYSIS_MODULES = [
+    "src.simso.model_builder", "src.simso.entropy_accumulator", "src.entropy.analysis", "src.entropy.case_gen",
+    "src.simso.sim_data", "src.data.gen_results",
+]
+# modules importing the schedulers, their imports aren't followed by `analysis_source` since every scheduler is hashed
+# on its own by `scheduler_source`
+SCHEDULER_MODULES = ("src.schedulers.registry",)
+# root of the project, its modules and the simso ones are followed when hashing sources
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+SIMSO = "simso"
+
+
+class ResultCache:
+    """
+    On-disk cache of the output of a simulation, keyed by a hash of everything the output depends on (see `cache_key`).
+    Safe to share between processes, each one opens its own connection.
+    """
+    def __init__(self, path: str = CACHE_PATH, max_bytes: int = CACHE_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.connection = sqlite3.connect(path, timeout=60)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            "key TEXT PRIMARY KEY, scheduler TEXT, value TEXT, size INTEGER, last_used REAL)"
+        )
+        self.connection.commit()
+
+    def get(self, key: str):
+        row = self.connection.execute("SELECT value FROM results WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        with self.connection:
+            self.connection.execute("UPDATE results SET last_used = ? WHERE key = ?", (time.time(), key))
+        return json.loads(row[0])
+
+    def put(self, key: str, scheduler: str, value):
+        value = json.dumps(value)
+        with self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?)",
+                (key, scheduler, value, len(value), time.time()),
+            )
+
+    def size(self) -> int:
+        return self.connection.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+
+    def evict(self) -> int:
+        """
+        Removes the least recently used entries until the cache fits in `max_bytes`, returns the amount removed.
+        """
+        excess = self.size() - self.max_bytes
+        removed = 0
+        with self.connection:
+            for key, size in self.connection.execute("SELECT key, size FROM results ORDER BY last_used").fetchall():
+                if excess <= 0:
+                    break
+                self.connection.execute("DELETE FROM results WHERE key = ?", (key,))
+                excess -= size
+                removed += 1
+        return removed
+
+    def invalidate(self, scheduler: Optional[str] = None) -> int:
+        """
+        Removes the entries of a scheduler, or all of them, returns the amount removed.
+        """
+        with self.connection:
+            if scheduler is None:
+                cursor = self.connection.execute("DELETE FROM results")
+            else:
+                cursor = self.connection.execute("DELETE FROM results WHERE scheduler = ?", (scheduler,))
+        self.connection.execute("VACUUM")
+        return cursor.rowcount
+
+    def close(self):
+        self.connection.close()
+
+
+def scheduler_source(scheduler) -> str:
+    """
+    Hash of the source code of a scheduler, given as in `SchedulerInfo`, with the modules it imports (see
+    `source_paths`). The other files of its package are included when it's in the project, schedulers can load each
+    other by name (P_REORDER runs REORDER) without importing them.
+    """
+    if scheduler.get("filename"):
+        return paths_source(source_paths(None, scheduler["filename"]))
+
+    module = scheduler["clas"].__module__ if isinstance(scheduler["clas"], type) else scheduler["clas"]
+    spec = importlib.util.find_spec(module)
+    assert spec is not None and spec.origin is not None, f"Scheduler {module} not found"
+    paths = source_paths(module, spec.origin)
+    if in_directory(spec.origin, ROOT):
+        directory = os.path.dirname(spec.origin)
+        paths += tuple(os.path.join(directory, f) for f in os.listdir(directory) if f.endswith(".py"))
+    return paths_source(paths)
+
+
+def analysis_source() -> str:
+    """
+    Hash of the source code of `ANALYSIS_MODULES` with the modules they import.
+    """
+    return paths_source(analysis_paths())
+
+
+def analysis_paths() -> Tuple[str, ...]:
+    paths = ()
+    for module in ANALYSIS_MODULES:
+        spec = importlib.util.find_spec(module)
+        assert spec is not None and spec.origin is not None, f"Module {module} not found"
+        paths += source_paths(module, spec.origin, SCHEDULER_MODULES)
+    return tuple(dict.fromkeys(paths))
+
+
+@functools.lru_cache(maxsize=None)
+def source_paths(module: Optional[str], path: str, boundary: Tuple[str, ...] = ()) -> Tuple[str, ...]:
+    """
+    Source file of a module and, transitively, of the modules it imports from the project or from simso, so a
+    scheduler brings the simso helpers it's built on. The module name resolves relative imports.
+    The modules of `boundary` are included but their imports aren't followed.
+    """
+    scopes = [ROOT, os.path.dirname(path)]
+    simso = importlib.util.find_spec(SIMSO)
+    if simso is not None and simso.submodule_search_locations:
+        scopes.append(list(simso.submodule_search_locations)[0])
+
+    paths = [path]
+    pending: List[Tuple[Optional[str], str]] = [(module, path)]
+    while pending:
+        module, path = pending.pop()
+        if module is None:
+            package = None
+        else:
+            package = module if os.path.basename(path) == "__init__.py" else module.rpartition(".")[0]
+        for name in imported_modules(path, package):
+            try:
+                spec = importlib.util.find_spec(name)
+            except (ImportError, ValueError):
+                continue
+            if spec is None or spec.origin is None or not spec.origin.endswith(".py") or spec.origin in paths:
+                continue
+            if "site-packages" in spec.origin and in_directory(spec.origin, ROOT):
+                # a virtual environment in the project
+                continue
+            if any(in_directory(spec.origin, scope) for scope in scopes):
+                paths.append(spec.origin)
+                if name not in boundary:
+                    pending.append((name, spec.origin))
+    return tuple(paths)
+
+
+def imported_modules(path: str, package: Optional[str]) -> List[str]:
+    """
+    Absolute names of the modules imported by a source file, `from a import b` gives both a and a.b since b may be a
+    module. Relative imports are skipped without a package.
+    """
+    with open(path, "rb") as f:
+        tree = ast.parse(f.read(), path)
+    names = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            names += [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom):
+            if node.level:
+                if not package:
+                    continue
+                try:
+                    base = importlib.util.resolve_name("." * node.level + (node.module or ""), package)
+                except ImportError:
+                    continue
+            else:
+                base = node.module
+            names.append(base)
+            names += [f"{base}.{alias.name}" for alias in node.names if alias.name != "*"]
+    return names
+
+
+def in_directory(path: str, directory: str) -> bool:
+    path, directory = os.path.abspath(path), os.path.abspath(directory)
+    return os.path.commonpath([path, directory]) == directory
+
+
+@functools.lru_cache(maxsize=None)
+def paths_source(paths: Tuple[str, ...]) -> str:
+    digest = hashlib.sha1()
+    for path in sorted(set(paths)):
+        with open(path, "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def cache_key(test_id: str, source: str, parameters) -> str:
+    """
+    Key of a simulation: the test, the scheduler source and every parameter the output depends on (durations, seed,
+    modes and the `analysis_source`), `parameters` has to be JSON serializable.
+    """
+    return hashlib.sha1(json.dumps([test_id, source, parameters], sort_keys=True).encode()).hexdigest()
@@ -0,0 +1,345 @@
+import hashlib
+import json
+import os
+from typing import Dict, List, Optional
+
+import numpy as np
+
+VERSION = 1
+
+
+class Table:
+    """
+    Columns of a table stored as raw little-endian arrays, one `{name}.{column}.bin` file per column, so they can be
+    appended to and memory-mapped.
+    """
+    def __init__(self, directory: str, name: str, columns: Dict[str, str]):
+        self.directory = directory
+        self.name = name
+        self.columns = {column: np.dtype(dtype) for column, dtype in columns.items()}
+        self.cache = {}
+
+    def path(self, column: str) -> str:
+        return os.path.join(self.directory, f"{self.name}.{column}.bin")
+
+    def create(self):
+        for column in self.columns:
+            open(self.path(column), "wb").close()
+
+    def append(self, rows: Dict[str, np.ndarray]):
+        assert rows.keys() == self.columns.keys(), f"Columns of {self.name} don't match"
+        lengths = {len(values) for values in rows.values()}
+        assert len(lengths) == 1, f"Columns of {self.name} have different lengths"
+        for column, values in rows.items():
+            with open(self.path(column), "ab") as f:
+                f.write(np.ascontiguousarray(values, dtype=self.columns[column]).tobytes())
+        self.cache.clear()
+
+    def __len__(self) -> int:
+        column, dtype = next(iter(self.columns.items()))
+        return os.path.getsize(self.path(column)) // dtype.itemsize
+
+    def __getitem__(self, column: str) -> np.ndarray:
+        """
+        The column memory-mapped read-only.
+        """
+        if column not in self.cache:
+            dtype = self.columns[column]
+            if os.path.getsize(self.path(column)) == 0:
+                self.cache[column] = np.empty(0, dtype=dtype)
+            else:
+                self.cache[column] = np.memmap(self.path(column), dtype=dtype, mode="r")
+        return self.cache[column]
+
+
+def read_manifest(path: str, format: str, versions=(VERSION,)) -> dict:
+    manifest_path = os.path.join(path, "manifest.json")
+    if not os.path.isfile(manifest_path):
+        raise ValueError(f"{path} is not a {format} store, files from older versions can be converted with `convert`")
+    with open(manifest_path, "r") as f:
+        manifest = json.load(f)
+    assert manifest["format"] == format, f"{path} is a {manifest['format']} store, not {format}"
+    assert manifest["version"] in versions, f"Unsupported {format} store version {manifest['version']}"
+    return manifest
+
+def write_manifest(path: str, manifest: dict):
+    # written to the side and renamed so a reader never sees half a manifest
+    with open(os.path.join(path, "manifest.json.tmp"), "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(os.path.join(path, "manifest.json.tmp"), os.path.join(path, "manifest.json"))
+
+
+def taskset_id(tasks: List[dict], processors: int) -> str:
+    """
+    Stable id of a test from its content, so the results survive the bucket file being reordered or extended.
+    """
+    return hashlib.sha1(json.dumps([processors, tasks], sort_keys=True).encode()).hexdigest()
+
+
+class BucketStore:
+    """
+    Tasksets grouped in buckets by processor count and utilization.
+    The tasks of all the tasksets are stored once in flat columns, each taskset is a row pointing to its range of
+    tasks, tasksets are referred to by their row.
+    """
+    TASKS = {"period": "<i8", "deadline": "<i8", "activation_date": "<i8", "proportion": "<f8", "wcet": "<f8"}
+    TASKSETS = {"processors": "<i4", "bucket": "<i4", "start": "<i8", "count": "<i4", "id": "S40"}
+
+    def __init__(self, path: str):
+        self.path = path
+        self.manifest = read_manifest(path, "buckets")
+        self.tasks = Table(path, "tasks", self.TASKS)
+        self.tasksets = Table(path, "tasksets", self.TASKSETS)
+        self.rows_cache = {}
+
+    @classmethod
+    def create(cls, path: str, grid: dict) -> "BucketStore":
+        """
+        Creates an empty store for the experiment grid, a dict with
+        - processors: processor counts
+        - buckets: amount of utilization buckets, bucket i holds utilizations in [i/buckets, (i+1)/buckets] of p
+        - tasks_per_bucket: tasksets in every (processors, bucket) cell
+        - period_choices: periods the tasks are generated with
+        - seed: master seed they were generated with, None if unknown
+        """
+        os.makedirs(path, exist_ok=True)
+        Table(path, "tasks", cls.TASKS).create()
+        Table(path, "tasksets", cls.TASKSETS).create()
+        write_manifest(path, {"format": "buckets", "version": VERSION, "grid": grid})
+        return cls(path)
+
+    @property
+    def grid(self) -> dict:
+        return self.manifest["grid"]
+
+    @property
+    def processors(self) -> List[int]:
+        return self.grid["processors"]
+
+    @property
+    def buckets(self) -> int:
+        return self.grid["buckets"]
+
+    def add(self, processors: int, bucket: int, tasks: List[dict]) -> int:
+        """
+        Appends a taskset, returns its row.
+        """
+        return self.extend([(processors, bucket, tasks)])[0]
+
+    def extend(self, tasksets) -> List[int]:
+        """
+        Appends (processors, bucket, tasks) tasksets with a single write per column, returns their rows.
+        """
+        first = len(self.tasksets)
+        start = len(self.tasks)
+        rows = {column: [] for column in self.TASKSETS}
+        tasks = {column: [] for column in self.TASKS}
+        for processors, bucket, taskset in tasksets:
+            rows["processors"].append(processors)
+            rows["bucket"].append(bucket)
+            rows["start"].append(start)
+            rows["count"].append(len(taskset))
+            rows["id"].append(taskset_id(taskset, processors))
+            for task in taskset:
+                for column in self.TASKS:
+                    tasks[column].append(task[column])
+            start += len(taskset)
+        self.tasks.append({column: np.array(values, dtype=self.TASKS[column]) for column, values in tasks.items()})
+        self.tasksets.append({column: np.array(values, dtype=self.TASKSETS[column]) for column, values in rows.items()})
+        self.rows_cache.clear()
+        return list(range(first, first + len(rows["start"])))
+
+    def __len__(self) -> int:
+        return len(self.tasksets)
+
+    def taskset(self, row: int) -> List[dict]:
+        """
+        The tasks of a taskset as the dicts `gen_tasks` generates.
+        """
+        start = int(self.tasksets["start"][row])
+        end = start + int(self.tasksets["count"][row])
+        columns = {column: self.tasks[column][start:end].tolist() for column in self.TASKS}
+        return [{column: columns[column][j] for column in self.TASKS} for j in range(end - start)]
+
+    def id(self, row: int) -> str:
+        return self.tasksets["id"][row].decode()
+
+    def rows(self, processors: int, bucket: int) -> np.ndarray:
+        """
+        Rows of the tasksets of a bucket, in the order they were added.
+        """
+        key = (processors, bucket)
+        if key not in self.rows_cache:
+            mask = (self.tasksets["processors"] == processors) & (self.tasksets["bucket"] == bucket)
+            self.rows_cache[key] = np.flatnonzero(mask)
+        return self.rows_cache[key]
+
+
+class ResultStore:
+    """
+    Results of `gen_results`, one row per (taskset, scheduler) referencing the taskset by its id in the bucket store,
+    so they still match their tasksets if the bucket store is reordered or extended, the variable amount of
+    resolutions of every result stored in a separate flat table.
+    """
+    VERSION = 2
+    RESULTS = {
+        "scheduler": "<i2", "processors": "<i4", "bucket": "<i4", "taskset": "S40", "entropy": "<f8",
+        "entropy2": "<f8", "hyperperiods": "<i4", "resolutions_start": "<i8", "resolutions_count": "<i4",
+    }
+    # version 1 referenced the tasksets by their row in the bucket store
+    RESULTS_V1 = {**RESULTS, "taskset": "<i8"}
+    RESOLUTIONS = {"k": "<i4", "l": "<i4", "entropy": "<f8"}
+
+    def __init__(self, path: str):
+        self.path = path
+        self.manifest = read_manifest(path, "results", (1, self.VERSION))
+        self.columns = self.RESULTS if self.manifest["version"] == self.VERSION else self.RESULTS_V1
+        self.results = Table(path, "results", self.columns)
+        self.resolutions = Table(path, "resolutions", self.RESOLUTIONS)
+
+    @classmethod
+    def write(cls, path: str, partial_result: dict, bucket_path: str) -> "ResultStore":
+        """
+        Stores a result dict as `gen_results` builds it, where every result has the row of its taskset in `taskset`.
+        Missing values (results from before entropy2 or the resolutions existed) are stored as NaN and -1.
+        """
+        bucket_store = BucketStore(bucket_path)
+        os.makedirs(path, exist_ok=True)
+        results = Table(path, "results", cls.RESULTS)
+        resolutions = Table(path, "resolutions", cls.RESOLUTIONS)
+        results.create()
+        resolutions.create()
+
+        schedulers = list(partial_result["data"].keys())
+        rows = {column: [] for column in cls.RESULTS}
+        resolution_rows = {column: [] for column in cls.RESOLUTIONS}
+        for s, name in enumerate(schedulers):
+            for p, buckets in partial_result["data"][name].items():
+                for i, bucket in enumerate(buckets):
+                    for result in bucket:
+                        rows["scheduler"].append(s)
+                        rows["processors"].append(p)
+                        rows["bucket"].append(i)
+                        rows["taskset"].append(bucket_store.id(result["taskset"]))
+                        rows["entropy"].append(result["entropy"])
+                        rows["entropy2"].append(result.get("entropy2", np.nan))
+                        rows["hyperperiods"].append(result.get("hyperperiods", -1))
+                        rows["resolutions_start"].append(len(resolution_rows["k"]))
+                        rows["resolutions_count"].append(len(result.get("resolutions", [])))
+                        for k, l, entropy in result.get("resolutions", []):
+                            resolution_rows["k"].append(k)
+                            resolution_rows["l"].append(l)
+                            resolution_rows["entropy"].append(np.nan if entropy is None else entropy)
+        results.append({column: np.array(values, dtype=cls.RESULTS[column]) for column, values in rows.items()})
+        resolutions.append({
+            column: np.array(values, dtype=cls.RESOLUTIONS[column]) for column, values in resolution_rows.items()
+        })
+
+        write_manifest(path, {
+            "format": "results",
+            "version": cls.VERSION,
+            "buckets": os.path.relpath(bucket_path, path),
+            "schedulers": schedulers,
+            "processors": list(next(iter(partial_result["data"].values())).keys()) if schedulers else [],
+            "missed": partial_result["missed"],
+            "timeouts": [(p, i, bucket_store.id(row), *rest) for p, i, row, *rest in partial_result["timeouts"]],
+        })
+        return cls(path)
+
+    def bucket_store(self) -> BucketStore:
+        return BucketStore(os.path.normpath(os.path.join(self.path, self.manifest["buckets"])))
+
+    def load(self, buckets: Optional[BucketStore] = None) -> dict:
+        """
+        The results as the dict `gen_results` builds, with the tasks of every result in "test".
+        The tasksets are looked up by id, a result whose taskset isn't in the bucket store anymore is an error.
+        """
+        buckets = buckets if buckets is not None else self.bucket_store()
+        schedulers = self.manifest["schedulers"]
+        buckets_amount = buckets.buckets
+        data = {name: {p: [[] for _ in range(buckets_amount)] for p in self.manifest["processors"]} for name in schedulers}
+
+        if self.manifest["version"] == self.VERSION:
+            ids = {}
+            for row in range(len(buckets)):
+                ids.setdefault(buckets.id(row), row)
+
+            def row_of(id) -> int:
+                id = id.decode() if isinstance(id, bytes) else id
+                assert id in ids, f"Taskset {id} of the results not found in {buckets.path}"
+                return ids[id]
+        else:
+            def row_of(row) -> int:
+                return row
+
+        columns = {column: self.results[column].tolist() for column in self.columns}
+        resolutions = {column: self.resolutions[column].tolist() for column in self.RESOLUTIONS}
+        tasksets = {}
+        for r in range(len(columns["scheduler"])):
+            row = row_of(columns["taskset"][r])
+            if row not in tasksets:
+                tasksets[row] = buckets.taskset(row)
+            result = {"entropy": columns["entropy"][r]}
+            if not np.isnan(columns["entropy2"][r]):
+                result["entropy2"] = columns["entropy2"][r]
+            start = columns["resolutions_start"][r]
+            result["resolutions"] = [
+                (resolutions["k"][j], resolutions["l"][j], None if np.isnan(resolutions["entropy"][j]) else resolutions["entropy"][j])
+                for j in range(start, start + columns["resolutions_count"][r])
+            ]
+            if columns["hyperperiods"][r] >= 0:
+                result["hyperperiods"] = columns["hyperperiods"][r]
+            result["taskset"] = row
+            result["test"] = tasksets[row]
+            data[schedulers[columns["scheduler"][r]]][columns["processors"][r]][columns["bucket"][r]].append(result)
+
+        return {
+            "grid": buckets.grid,
+            "missed": self.manifest["missed"],
+            "timeouts": [(p, i, row_of(taskset), *rest) for p, i, taskset, *rest in self.manifest["timeouts"]],
+            "data": data,
+        }
+
+
+def convert_buckets(file_path: str, path: str, processors: List[int], period_choices: List[int]) -> BucketStore:
+    """
+    Converts a bucket file written with `str()` by older versions into a bucket store.
+    """
+    with open(file_path, "r") as f:
+        input = eval(f.read())
+    assert len(input) == len(processors), "Input length is not as expected"
+    buckets = max(len(processor_buckets) for processor_buckets in input)
+    store = BucketStore.create(path, {
+        "processors": processors,
+        "buckets": buckets,
+        "tasks_per_bucket": max(len(bucket) for processor_buckets in input for bucket in processor_buckets.values()),
+        "period_choices": period_choices,
+        "seed": None,
+    })
+    for c, p in enumerate(processors):
+        for i in range(buckets):
+            store.extend([(p, i, tasks) for tasks in input[c][i]])
+    return store
+
+def convert_results(file_path: str, path: str, buckets: BucketStore) -> ResultStore:
+    """
+    Converts a result file written with `str()` by older versions into a result store, the tests of the results are
+    looked up in the (converted) bucket store they were generated from.
+    """
+    with open(file_path, "r") as f:
+        partial_result = eval(f.read())
+    partial_result.pop("idx", None)
+    rows = {buckets.id(row): row for row in range(len(buckets))}
+
+    def row(tasks, p):
+        id = taskset_id(tasks, p)
+        assert id in rows, f"Test of the results not found in {buckets.path}"
+        return rows[id]
+
+    for s in partial_result["data"]:
+        for p, processor_buckets in partial_result["data"][s].items():
+            for bucket in processor_buckets:
+                for result in bucket:
+                    result["taskset"] = row(result.pop("test"), p)
+    partial_result["timeouts"] = [(p, i, row(test, p), *rest) for p, i, test, *rest in partial_result["timeouts"]]
+    return ResultStore.write(path, partial_result, buckets.path)
@@ -0,0 +1,52 @@
+import os
+import random
+import tempfile
+import unittest
+
+import numpy as np
+from simso.generator.task_generator import StaffordRandFixedSum
+
+from src.entropy.case_gen import gen_tasks_batch, stafford_rand_fixed_sum, tasks_from_arrays
+from ..gen_buckets import decreasing_first_fit_succeeds, decreasing_first_fit_succeeds_batch, gen_buckets
+
+
+class GenBucketsTest(unittest.TestCase):
+    def test_stafford_matches_upstream(self):
+        for n, u in [(10, 3.7), (40, 35.2), (2, 0.3)]:
+            # same draws, only the final permutation is done differently
+            np.random.seed(5)
+            expected = np.sort(StaffordRandFixedSum(n, u, 1)[0])
+            np.random.seed(5)
+            got = np.sort(stafford_rand_fixed_sum(n, np.array([u]))[0])
+            np.testing.assert_array_equal(expected, got)
+
+        utilizations = stafford_rand_fixed_sum(12, np.array([0.5, 3.7, 11.9]))
+        np.testing.assert_allclose(utilizations.sum(axis=1), [0.5, 3.7, 11.9])
+
+    def test_first_fit_batch_matches(self):
+        random.seed(0)
+        np.random.seed(0)
+        for p in (4, 8):
+            for i in range(6, 10):
+                periods, wcets = gen_tasks_batch(3 * p, np.random.uniform(i/10 * p, (i+1)/10 * p, size=32))
+                fits = decreasing_first_fit_succeeds_batch(periods, wcets, p)
+                expected = [decreasing_first_fit_succeeds(tasks_from_arrays(periods[b], wcets[b]), p) for b in range(32)]
+                self.assertEqual(fits.tolist(), expected)
+
+    def test_same_buckets_for_any_process_count(self):
+        with tempfile.TemporaryDirectory() as directory:
+            stores = [
+                gen_buckets(os.path.join(directory, str(processes)), seed=3, processes=processes, processors=[2, 4],
+                            buckets=4, tasks_per_bucket=3)
+                for processes in (1, 3)
+            ]
+            self.assertEqual(len(stores[0]), 2 * 4 * 3)
+            for store in stores[1:]:
+                self.assertEqual(store.grid, stores[0].grid)
+                for table, expected in [(store.tasks, stores[0].tasks), (store.tasksets, stores[0].tasksets)]:
+                    for column in table.columns:
+                        self.assertEqual(table[column].tolist(), expected[column].tolist())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,134 @@
+import os
+import tempfile
+import time
+import unittest
+from multiprocessing import Process
+from unittest import mock
+
+from simso.schedulers.EDF import EDF
+
+from .. import gen_results
+from ..gen_results import (
+    append_checkpoint, default_partial_result, handle_result, merge_outputs, read_checkpoint, run_scheduler,
+    scheduler_names, schedulers,
+)
+from ..store import BucketStore, ResultStore
+from .test_result_cache import TASKS
+
+GRID = {"processors": [2, 3], "buckets": 1, "tasks_per_bucket": 1, "period_choices": [5, 10, 20], "seed": 0}
+
+
+class GenResultsTest(unittest.TestCase):
+    def test_adaptive_replays_repeating_schedules(self):
+        scheduler = schedulers()[0]
+        expected, _, _ = run_scheduler(TASKS, 2, scheduler)
+        result, _, error = run_scheduler(TASKS, 2, scheduler, adaptive=True)
+        self.assertIsNone(error)
+        self.assertEqual(result["hyperperiods"], 2)
+        self.assertAlmostEqual(result["entropy"], expected["entropy"], places=9)
+
+        # not in the deterministic schedulers of the registry, so it isn't replayed even if it repeats
+        result, _, _ = run_scheduler(TASKS, 2, {"clas": EDF}, adaptive=True)
+        self.assertNotEqual(result["hyperperiods"], 2)
+
+    def test_replay_follows_choices(self):
+        scheduler = schedulers()[0]
+        expected, _, _ = run_scheduler(TASKS, 2, scheduler, choices=[100])
+        result, _, _ = run_scheduler(TASKS, 2, scheduler, replay=True, choices=[100])
+        self.assertEqual([(k, l) for k, l, _ in result["resolutions"]], [(k, l) for k, l, _ in expected["resolutions"]])
+        for (_, _, got), (_, _, entropy) in zip(result["resolutions"], expected["resolutions"]):
+            self.assertAlmostEqual(got, entropy, places=9)
+
+    def test_timeout_drops_the_test(self):
+        names = scheduler_names()
+        partial_result = default_partial_result([2], 1)
+        outputs = {s: {"result": {"entropy": float(s)}, "failed": None} for s in range(len(names))}
+        outputs[1] = None
+        handle_result((merge_outputs(outputs), 7), partial_result, 2, 0)
+        self.assertEqual(partial_result["timeouts"], [(2, 0, 7, names[1])])
+        self.assertEqual([len(partial_result["data"][name][2][0]) for name in names], [0] * len(names))
+
+        outputs[1] = {"result": {"entropy": 1.0}, "failed": None}
+        handle_result((merge_outputs(outputs), 8), partial_result, 2, 0)
+        self.assertEqual([len(partial_result["data"][name][2][0]) for name in names], [1] * len(names))
+
+    def test_checkpoint_drops_a_torn_line(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "2_0.jsonl")
+            with open(path, "a") as f:
+                append_checkpoint(f, {"id": "a"})
+                append_checkpoint(f, {"id": "b"})
+                # a crash in the middle of a write
+                f.write('{"id": "c", "out')
+            self.assertEqual(read_checkpoint(path, repair=False), [{"id": "a"}, {"id": "b"}])
+            self.assertEqual(read_checkpoint(path), [{"id": "a"}, {"id": "b"}])
+
+            with open(path, "a") as f:
+                append_checkpoint(f, {"id": "c"})
+            self.assertEqual(read_checkpoint(path), [{"id": "a"}, {"id": "b"}, {"id": "c"}])
+
+    def test_resume_only_runs_missing_tests(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "buckets")
+            store = BucketStore.create(path, GRID)
+            store.extend([(2, 0, TASKS[:2]), (3, 0, TASKS[:2])])
+            # a previous run finished the test on 3 processors
+            output = {"results": [{"entropy": 42.0}] * len(scheduler_names()), "failed": None, "timeouts": []}
+            os.makedirs(f"{path}_partial")
+            with open(gen_results.checkpoint_path(path, 3, 0), "a") as f:
+                append_checkpoint(f, {"id": store.id(1), "p": 3, "i": 0, "output": output})
+
+            with mock.patch.object(gen_results, "THREAD_COUNT", 2):
+                gen_results.gen_results(path, cache_path=None)
+
+            data = ResultStore(f"{path}_results").load()
+            for name in scheduler_names():
+                self.assertEqual([result["entropy"] for result in data["data"][name][3][0]], [42.0])
+                self.assertEqual(len(data["data"][name][2][0]), 1)
+                self.assertNotEqual(data["data"][name][2][0][0]["entropy"], 42.0)
+
+    def test_cells_save_the_results_once(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "buckets")
+            store = BucketStore.create(path, GRID)
+            store.extend([(2, 0, TASKS[:2]), (3, 0, TASKS[:2])])
+            # both cells are done, their runs only save the results and do it at the same time
+            os.makedirs(f"{path}_partial")
+            for row, p in enumerate([2, 3]):
+                output = {"results": [{"entropy": float(p)}] * len(scheduler_names()), "failed": None, "timeouts": []}
+                with open(gen_results.checkpoint_path(path, p, 0), "a") as f:
+                    append_checkpoint(f, {"id": store.id(row), "p": p, "i": 0, "output": output})
+
+            save_results = gen_results.save_results
+
+            def slow_save(*args):
+                # long enough for both runs to reach the save
+                with open(os.path.join(directory, "saves"), "a") as f:
+                    f.write("save\n")
+                time.sleep(0.5)
+                save_results(*args)
+
+            with mock.patch.object(gen_results, "THREAD_COUNT", 1), \
+                    mock.patch.object(gen_results, "save_results", slow_save):
+                runs = [
+                    Process(target=gen_results.gen_results, args=(path,), kwargs={"cells": [cell], "cache_path": None})
+                    for cell in [(2, 0), (3, 0)]
+                ]
+                for run in runs:
+                    run.start()
+                for run in runs:
+                    run.join()
+            self.assertEqual([run.exitcode for run in runs], [0, 0])
+            with open(os.path.join(directory, "saves")) as f:
+                self.assertEqual(f.read(), "save\n")
+
+            self.assertFalse(os.path.exists(f"{path}_partial"))
+            self.assertFalse(os.path.exists(f"{path}_results.tmp"))
+            data = ResultStore(f"{path}_results").load()
+            for name in scheduler_names():
+                self.assertEqual([[result["entropy"] for result in data["data"][name][p][0]] for p in [2, 3]],
+                                 [[2.0], [3.0]])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,88 @@
+import importlib.util
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from ..gen_results import run_scheduler, schedulers
+from ..result_cache import ANALYSIS_MODULES, ResultCache, analysis_paths, paths_source, source_paths
+
+TASKS = [
+    {"period": 5, "deadline": 5, "activation_date": 0, "proportion": 0.5, "wcet": 2},
+    {"period": 10, "deadline": 10, "activation_date": 0, "proportion": 0.5, "wcet": 4},
+    {"period": 20, "deadline": 20, "activation_date": 0, "proportion": 0.5, "wcet": 7},
+]
+
+
+class ResultCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.cache = ResultCache(os.path.join(self.directory.name, "cache.sqlite"))
+
+    def tearDown(self):
+        self.cache.close()
+        self.directory.cleanup()
+
+    def test_run_scheduler_hit(self):
+        scheduler = schedulers()[0]
+        result, model, error = run_scheduler(TASKS, 2, scheduler, cache=self.cache)
+        self.assertIsNotNone(model)
+        cached, model, cached_error = run_scheduler(TASKS, 2, scheduler, cache=self.cache)
+        self.assertIsNone(model)
+        self.assertEqual(error, cached_error)
+        self.assertEqual(result["entropy"], cached["entropy"])
+
+        # a different seed is a different simulation
+        _, model, _ = run_scheduler(TASKS, 2, scheduler, cache=self.cache, seed=1)
+        self.assertIsNotNone(model)
+
+    def test_evict_and_invalidate(self):
+        for key in range(10):
+            self.cache.put(str(key), "A" if key % 2 else "B", {"entropy": key})
+        time.sleep(0.01)
+        self.cache.get("0")
+
+        self.cache.max_bytes = self.cache.size() // 2
+        self.cache.evict()
+        self.assertLessEqual(self.cache.size(), self.cache.max_bytes)
+        # the least recently used go first
+        self.assertIsNotNone(self.cache.get("0"))
+        self.assertIsNone(self.cache.get("1"))
+
+        self.cache.invalidate("B")
+        self.assertIsNone(self.cache.get("0"))
+        self.assertIsNotNone(self.cache.get("9"))
+
+    def test_sources_follow_imports(self):
+        def file_names(module):
+            return [os.path.basename(path) for path in source_paths(module, importlib.util.find_spec(module).origin)]
+
+        # the shared RUN code and the simso helpers the schedulers are built on
+        self.assertIn("RUN_definitions.py", file_names("src.schedulers.RUN_RANDOM"))
+        self.assertIn("PartitionedScheduler.py", file_names("simso.schedulers.P_EDF"))
+        self.assertIn("analysis.py", [name for module in ANALYSIS_MODULES for name in file_names(module)])
+
+    def test_analysis_source_covers_the_pipeline(self):
+        paths = analysis_paths()
+        names = [os.path.basename(path) for path in paths]
+        for name in ["gen_results.py", "sim_data.py", "registry.py"]:
+            self.assertIn(name, names)
+        # the schedulers are hashed on their own
+        self.assertNotIn("RUN_RANDOM.py", names)
+
+        # editing any of them changes the key, on copies since the hash of the real files is cached
+        copies = []
+        for k, path in enumerate(paths):
+            copies.append(os.path.join(self.directory.name, f"{k}_{os.path.basename(path)}"))
+            shutil.copyfile(path, copies[-1])
+        source = paths_source.__wrapped__(tuple(copies))
+        for name in ["gen_results.py", "sim_data.py"]:
+            with open(copies[names.index(name)], "a") as f:
+                f.write("\n")
+            self.assertNotEqual(paths_source.__wrapped__(tuple(copies)), source)
+            source = paths_source.__wrapped__(tuple(copies))
+
+
+if __name__ == "__main__":
+    unittest.main()
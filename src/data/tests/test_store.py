@@ -0,0 +1,94 @@
+import os
+import tempfile
+import unittest
+
+from ..store import BucketStore, ResultStore, convert_buckets, convert_results, taskset_id
+
+TASKSETS = [
+    [{"period": 10, "deadline": 10, "activation_date": 0, "proportion": 0.5, "wcet": 3.141592653589793}],
+    [
+        {"period": 20, "deadline": 20, "activation_date": 0, "proportion": 0.5, "wcet": 0.1},
+        {"period": 50, "deadline": 50, "activation_date": 0, "proportion": 0.5, "wcet": 12.5},
+    ],
+    [{"period": 25, "deadline": 25, "activation_date": 0, "proportion": 0.5, "wcet": 7.0}],
+]
+
+
+class StoreTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = lambda name: os.path.join(self.directory.name, name)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_buckets_roundtrip(self):
+        grid = {"processors": [2, 4], "buckets": 2, "tasks_per_bucket": 2, "period_choices": [10, 20, 25, 50], "seed": 0}
+        store = BucketStore.create(self.path("buckets"), grid)
+        store.add(2, 1, TASKSETS[0])
+        store.extend([(4, 0, TASKSETS[1]), (2, 1, TASKSETS[2])])
+
+        store = BucketStore(self.path("buckets"))
+        self.assertEqual(store.rows(2, 1).tolist(), [0, 2])
+        self.assertEqual(store.rows(2, 0).tolist(), [])
+        for row, (p, tasks) in enumerate([(2, TASKSETS[0]), (4, TASKSETS[1]), (2, TASKSETS[2])]):
+            self.assertEqual(store.taskset(row), tasks)
+            # same types too, the id hashes the json of the tasks
+            self.assertEqual(store.id(row), taskset_id(store.taskset(row), p))
+            self.assertEqual(store.id(row), taskset_id(tasks, p))
+
+    def test_convert(self):
+        with open(self.path("buckets.json"), "w") as f:
+            f.write(str([{0: [TASKSETS[0], TASKSETS[2]], 1: []}, {0: [], 1: [TASKSETS[1]]}]))
+        result = {"entropy": 1.5, "entropy2": 0.25, "resolutions": [(10, 100, 1.25), (25, 100, None)], "hyperperiods": 100}
+        results = {
+            "idx": 3,
+            "timeouts": [(4, 1, TASKSETS[1], "B")],
+            "missed": {"A": 1, "B": 0},
+            "data": {
+                "A": {2: [[{**result, "test": TASKSETS[2]}], []], 4: [[], []]},
+                # without the values added later
+                "B": {2: [[{"entropy": 2.0, "test": TASKSETS[0]}], []], 4: [[], []]},
+            },
+        }
+        with open(self.path("buckets_results.json"), "w") as f:
+            f.write(str(results))
+
+        buckets = convert_buckets(self.path("buckets.json"), self.path("buckets"), [2, 4], [10, 20, 25, 50])
+        self.assertEqual(buckets.rows(4, 1).tolist(), [2])
+        self.assertEqual(buckets.grid["tasks_per_bucket"], 2)
+        convert_results(self.path("buckets_results.json"), self.path("buckets_results"), buckets)
+
+        data = ResultStore(self.path("buckets_results")).load()
+        self.assertEqual(data["missed"], results["missed"])
+        self.assertEqual(data["timeouts"], [(4, 1, 2, "B")])
+        self.assertEqual(data["data"]["A"][2][0], [{**result, "taskset": 1, "test": TASKSETS[2]}])
+        self.assertEqual(data["data"]["B"][2][0], [{"entropy": 2.0, "resolutions": [], "taskset": 0, "test": TASKSETS[0]}])
+
+    def test_results_follow_taskset_ids(self):
+        grid = {"processors": [2], "buckets": 1, "tasks_per_bucket": 3, "period_choices": [10, 20, 25, 50], "seed": 0}
+        store = BucketStore.create(self.path("buckets"), grid)
+        store.extend([(2, 0, tasks) for tasks in TASKSETS])
+        partial_result = {
+            "timeouts": [(2, 0, 2, "A")],
+            "missed": {"A": 0},
+            "data": {"A": {2: [[{"entropy": float(row), "taskset": row} for row in range(2)]]}},
+        }
+        results = ResultStore.write(self.path("buckets_results"), partial_result, store.path)
+
+        # regenerated in another order and extended
+        reordered = BucketStore.create(self.path("reordered"), grid)
+        reordered.extend([(2, 0, tasks) for tasks in [TASKSETS[2], TASKSETS[1], [], TASKSETS[0]]])
+        data = results.load(reordered)
+        self.assertEqual([(result["entropy"], result["test"]) for result in data["data"]["A"][2][0]],
+                         [(0.0, TASKSETS[0]), (1.0, TASKSETS[1])])
+        self.assertEqual(data["timeouts"], [(2, 0, 0, "A")])
+
+        missing = BucketStore.create(self.path("missing"), grid)
+        missing.extend([(2, 0, TASKSETS[1])])
+        with self.assertRaises(AssertionError):
+            results.load(missing)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,15 +1,20 @@
-from typing import List
+from typing import List, Optional, Tuple
 import math
 
+import numpy as np
+
 
 K = 100
 HYPERPERIOD_LEN = 100
 m = 35  # int(HYPERPERIOD_LEN * 0.35)
 pi = 10  # HYPERPERIOD_LEN * 0.1
+# amounts of hyperperiods of HYPERPERIOD_LEN the entropy is also reported for, to check its convergence
+PREFIX_LENGTHS = [10, 25, 50, K]
 
 
 # REORDER entropy calculation, way heavier, not sure if worth it
-def entropy2(data: List[List[List[int]]], _) -> float:
+# see entropy2_vectorized for the version used on the results pipeline
+def entropy2(data: List[List[List[int]]], _, hyperperiod_amount = K, hyperperiod_len = HYPERPERIOD_LEN) -> float:
     """
     Calculates the entropy of the schedule.
     data: Processor -> Hyperperiod -> Execution (start, end, task)
@@ -17,30 +22,59 @@ def entropy2(data: List[List[List[int]]], _) -> float:
 
     def n(t: int) -> float:
         ans = 0.0
-        for k in range(1, K + 1):
+        for k in range(hyperperiod_amount):
             ans += math.log2(C(k, t))
-        return -ans / K
+        return -ans / hyperperiod_amount
 
     def C(k: int, t: int) -> float:
         ans = 0
-        for kl in range(1, K + 1):
-            ans += 1 if hamming(data[0][k], data[0][kl], t) <= pi else 0
-        return ans / K
+        for kl in range(hyperperiod_amount):
+            ans += 1 if hamming(data[0][k], data[0][kl], t, hyperperiod_len) <= pi else 0
+        return ans / hyperperiod_amount
 
     ans = 0.0
-    for t in range(HYPERPERIOD_LEN):
+    for t in range(hyperperiod_len):
         ans += n(t)
     return ans / m
 
 
-def hamming(a: List[int], b: List[int], offset: int) -> int:
+def hamming(a: List[int], b: List[int], offset: int, hyperperiod_len = HYPERPERIOD_LEN) -> int:
     ans = 0
     for i in range(m):
-        if a[(i + offset) % HYPERPERIOD_LEN] != b[(i + offset) % HYPERPERIOD_LEN]:
+        if a[(i + offset) % hyperperiod_len] != b[(i + offset) % hyperperiod_len]:
             ans += 1
     return ans
 
 
+def entropy2_vectorized(schedule: np.ndarray) -> float:
+    """
+    Calculates the REORDER entropy (`entropy2`) of every processor that ran something and averages them.
+    schedule: integer array of shape (processors, hyperperiods, hyperperiod_len), each slot holds the task running on it (0 if idle)
+    """
+    entropies = [processor_entropy2(hyperperiods) for hyperperiods in schedule if hyperperiods.any()]
+    if not entropies:
+        return 0.0
+    return sum(entropies) / len(entropies)
+
+
+def processor_entropy2(hyperperiods: np.ndarray) -> float:
+    """
+    `entropy2` of a single processor, the window hamming distances of all hyperperiod pairs on all offsets are
+    computed at once with cumulative sums of the slot mismatches.
+    hyperperiods: integer array of shape (hyperperiods, hyperperiod_len)
+    """
+    hyperperiod_amount, hyperperiod_len = hyperperiods.shape
+    # repeat the start of the hyperperiod so windows can wrap around it
+    wrapped = np.take(hyperperiods, np.arange(hyperperiod_len + m) % hyperperiod_len, axis=1)
+    mismatches = np.zeros((hyperperiod_amount, hyperperiod_amount, hyperperiod_len + m + 1), dtype=np.int16)
+    np.cumsum(wrapped[:, None, :] != wrapped[None, :, :], axis=2, out=mismatches[:, :, 1:])
+    # Hyperperiod -> Hyperperiod -> Offset
+    distances = mismatches[:, :, m:m + hyperperiod_len] - mismatches[:, :, :hyperperiod_len]
+
+    C = np.count_nonzero(distances <= pi, axis=1) / hyperperiod_amount
+    return float(-np.log2(C).sum() / hyperperiod_amount / m)
+
+
 def entropy(data: List[List[List[int]]], task_amount: int, processor_amount: int = 1, hyperperiod_amount = K, hyperperiod_len = HYPERPERIOD_LEN) -> float:
     """
     Calculates the entropy of the schedule.
@@ -71,3 +105,137 @@ def entropy(data: List[List[List[int]]], task_amount: int, processor_amount: int
     for t in range(hyperperiod_len):
         ans += n(t)
     return ans
+
+
+def entropy_vectorized(schedule: np.ndarray, task_amount: int) -> float:
+    """
+    Calculates the entropy of the schedule, same result as `entropy` but computed with batch operations.
+    schedule: integer array of shape (processors, hyperperiods, hyperperiod_len), each slot holds the task running on it (0 if idle)
+    """
+    _, hyperperiod_amount, hyperperiod_len = schedule.shape
+
+    # offset every slot so a single bincount gives the task frequencies of all slots at once
+    offsets = np.arange(hyperperiod_len) * (task_amount + 1)
+    tasks_freq = np.bincount(
+        (schedule + offsets).ravel(), minlength=hyperperiod_len * (task_amount + 1)
+    ).reshape(hyperperiod_len, task_amount + 1)
+
+    processors_used = np.count_nonzero((schedule != 0).any(axis=1), axis=0)
+    return slots_entropy(tasks_freq[:, 1:], processors_used, hyperperiod_amount)
+
+
+def slots_entropy(tasks_freq: np.ndarray, processors_used: np.ndarray, hyperperiod_amount: int) -> float:
+    """
+    Sums the entropy of every slot of the hyperperiod.
+    tasks_freq: Slot -> Task -> amount of hyperperiods (over all processors) the task ran on the slot, idle excluded
+    processors_used: Slot -> amount of processors that ran something on the slot
+    """
+    used = tasks_freq > 0
+    p = tasks_freq[used] / (hyperperiod_amount * np.broadcast_to(processors_used[:, None], tasks_freq.shape)[used])
+    return float(np.sum(-p * np.log2(p)))
+
+
+class SlotFrequencies:
+    """
+    Per-slot task frequencies of a schedule, accumulated straight from the execution intervals with difference arrays
+    so the per-ms hyperperiod grid is never built.
+    """
+
+    def __init__(self, task_amount: int, processor_amount: int, hyperperiod_amount=K, hyperperiod_len=HYPERPERIOD_LEN):
+        self.task_amount = task_amount
+        self.hyperperiod_amount = hyperperiod_amount
+        self.hyperperiod_len = hyperperiod_len
+        # Task -> Slot and Processor -> Slot difference arrays, the extra slot closes ranges that reach the hyperperiod end
+        self.tasks_diff = [[0] * (hyperperiod_len + 1) for _ in range(task_amount + 1)]
+        self.processors_diff = [[0] * (hyperperiod_len + 1) for _ in range(processor_amount)]
+        # amount of hyperperiods each processor reached, used by the all_empty rule
+        self.hyperperiods = [0] * processor_amount
+
+    def add(self, processor: int, start: int, end: int, task: int):
+        """
+        Adds the execution of task on processor during [start, end) ms.
+        """
+        if start >= end:
+            return
+        hyperperiods = (end - 1) // self.hyperperiod_len + 1
+        assert hyperperiods <= self.hyperperiod_amount, f"Expected {self.hyperperiod_amount} hyperperiods, got {hyperperiods}"
+        self.hyperperiods[processor] = max(self.hyperperiods[processor], hyperperiods)
+
+        laps, rest = divmod(end - start, self.hyperperiod_len)
+        first = start % self.hyperperiod_len
+        for diff in (self.tasks_diff[task], self.processors_diff[processor]):
+            if laps:
+                diff[0] += laps
+                diff[self.hyperperiod_len] -= laps
+            if rest:
+                self._add_range(diff, first, first + rest)
+
+    def _add_range(self, diff: List[int], start: int, end: int):
+        if end <= self.hyperperiod_len:
+            diff[start] += 1
+            diff[end] -= 1
+        else:
+            diff[start] += 1
+            diff[self.hyperperiod_len] -= 1
+            diff[0] += 1
+            diff[end - self.hyperperiod_len] -= 1
+
+    @property
+    def duration(self) -> int:
+        return self.hyperperiod_amount * self.hyperperiod_len
+
+    def copy(self) -> "SlotFrequencies":
+        frequencies = SlotFrequencies.__new__(SlotFrequencies)
+        frequencies.task_amount = self.task_amount
+        frequencies.hyperperiod_amount = self.hyperperiod_amount
+        frequencies.hyperperiod_len = self.hyperperiod_len
+        frequencies.tasks_diff = [diff[:] for diff in self.tasks_diff]
+        frequencies.processors_diff = [diff[:] for diff in self.processors_diff]
+        frequencies.hyperperiods = self.hyperperiods[:]
+        return frequencies
+
+    def replicate(self, times: int) -> "SlotFrequencies":
+        """
+        Frequencies of the schedule repeated times in a row, for schedules known to repeat.
+        """
+        frequencies = self.copy()
+        frequencies.hyperperiod_amount *= times
+        frequencies.tasks_diff = [[x * times for x in diff] for diff in self.tasks_diff]
+        frequencies.processors_diff = [[x * times for x in diff] for diff in self.processors_diff]
+        frequencies.hyperperiods = [
+            (times - 1) * self.hyperperiod_amount + h if h > 0 else 0 for h in self.hyperperiods
+        ]
+        return frequencies
+
+    def all_empty(self) -> bool:
+        """
+        True if no processor reaches the last hyperperiod, same rule as `SimData.into_hyperperiods`.
+        """
+        return all(h < self.hyperperiod_amount for h in self.hyperperiods)
+
+    def frequencies(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Returns the task frequencies (Slot -> Task, idle excluded) and the amount of processors used on each slot.
+        """
+        tasks_freq = np.cumsum(np.array(self.tasks_diff)[1:, :-1], axis=1).T
+        processors_used = np.count_nonzero(np.cumsum(np.array(self.processors_diff)[:, :-1], axis=1) > 0, axis=0)
+        return tasks_freq, processors_used
+
+    def entropy(self) -> float:
+        tasks_freq, processors_used = self.frequencies()
+        return slots_entropy(tasks_freq, processors_used, self.hyperperiod_amount)
+
+
+def entropy_intervals(executions: List[List[Tuple[int, int, int]]], task_amount: int, hyperperiod_amount=K, hyperperiod_len=HYPERPERIOD_LEN) -> Optional[float]:
+    """
+    Calculates the entropy of the schedule from its execution intervals, None if all processors are empty.
+    executions: Processor -> Execution (start, end, task)
+    """
+    frequencies = SlotFrequencies(task_amount, len(executions), hyperperiod_amount, hyperperiod_len)
+    for processor, processor_executions in enumerate(executions):
+        for start, end, task in processor_executions:
+            frequencies.add(processor, start, end, task)
+
+    if frequencies.all_empty():
+        return None
+    return frequencies.entropy()
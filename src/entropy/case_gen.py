@@ -1,8 +1,10 @@
 import math
+from typing import List, Tuple
+import numpy as np
 from simso.generator.task_generator import StaffordRandFixedSum
 import random
 
-from src.entropy.analysis import HYPERPERIOD_LEN
+from src.entropy.analysis import HYPERPERIOD_LEN, PREFIX_LENGTHS
 
 period_choices = [10, 20, 25, 50, 100]
 def lcm(a, b):
@@ -17,6 +19,21 @@ def lcmlist(args):
 assert lcmlist(period_choices) == HYPERPERIOD_LEN, "LCM of periods is not as expected"
 
 
+def resolutions(tasks, choices=period_choices):
+    """
+    (hyperperiod_amount, hyperperiod_len) pairs the entropy of the tasks schedule can be measured with:
+    every period choice that is a multiple of the tasks hyperperiod, over the same prefixes of the simulation as PREFIX_LENGTHS.
+    """
+    hyperperiod = lcmlist([task["period"] for task in tasks])
+    ans = []
+    for hyperperiod_len in choices:
+        if hyperperiod_len % hyperperiod != 0:
+            continue
+        for prefix in PREFIX_LENGTHS:
+            ans.append((prefix * HYPERPERIOD_LEN // hyperperiod_len, hyperperiod_len))
+    return ans
+
+
 def gen_tasks(n: int, u: float):
     sets = StaffordRandFixedSum(n, u, 1)
     assert sets is not None and len(sets) == 1, "StaffordRandFixedSum returned unexpected result"
@@ -36,3 +53,81 @@ def gen_tasks(n: int, u: float):
         )
 
     return tasks
+
+
+def stafford_rand_fixed_sum(n: int, u: np.ndarray) -> np.ndarray:
+    """
+    `StaffordRandFixedSum` vectorized over a batch of total utilizations: one set of n utilizations summing to u[b]
+    for every b, drawn the same way as `StaffordRandFixedSum(n, u[b], 1)`, the tables are built for all of them at once.
+    """
+    u = np.asarray(u, dtype=float)
+    nsets = len(u)
+    if n == 1:
+        return u[:, None].copy()
+
+    k = np.minimum(u.astype(int), n - 1)
+    m = np.arange(n)
+    s1 = u[:, None] - (k[:, None] - m)
+    s2 = (k[:, None] + n - m) - u[:, None]
+
+    tiny = np.finfo(float).tiny
+    huge = np.finfo(float).max
+
+    w = np.zeros((nsets, n, n + 1))
+    w[:, 0, 1] = huge
+    t = np.zeros((nsets, n - 1, n))
+
+    for i in range(2, n + 1):
+        tmp1 = w[:, i - 2, 1:i + 1] * s1[:, :i] / float(i)
+        tmp2 = w[:, i - 2, :i] * s2[:, n - i:] / float(i)
+        w[:, i - 1, 1:i + 1] = tmp1 + tmp2
+        tmp3 = w[:, i - 1, 1:i + 1] + tiny
+        tmp4 = s2[:, n - i:] > s1[:, :i]
+        t[:, i - 2, :i] = (tmp2 / tmp3) * tmp4 + (1 - tmp1 / tmp3) * np.logical_not(tmp4)
+
+    x = np.zeros((nsets, n))
+    rt = np.random.uniform(size=(n - 1, nsets))  # rand simplex type
+    rs = np.random.uniform(size=(n - 1, nsets))  # rand position in simplex
+    s = u.copy()
+    j = k + 1
+    sm = np.zeros(nsets)
+    pr = np.ones(nsets)
+    sets = np.arange(nsets)
+
+    for i in range(n - 1, 0, -1):  # iterate through dimensions
+        # decide which direction to move in this dimension (1 or 0):
+        e = rt[(n - i) - 1] <= t[sets, i - 1, j - 1]
+        sx = rs[(n - i) - 1] ** (1.0 / i)  # next simplex coord
+        sm = sm + (1.0 - sx) * pr * s / (i + 1)
+        pr = sx * pr
+        x[:, (n - i) - 1] = sm + pr * e
+        s = s - e
+        j = j - e  # change transition table column if required
+
+    x[:, n - 1] = sm + pr * s
+
+    # iterated in fixed dimension order, permute every set
+    order = np.argsort(np.random.uniform(size=(nsets, n)), axis=1)
+    return np.take_along_axis(x, order, axis=1)
+
+
+def gen_tasks_batch(n: int, u: np.ndarray, choices=period_choices) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    A batch of `gen_tasks(n, u[b])` tasksets as (periods, wcets) arrays of shape (len(u), n).
+    """
+    utilizations = stafford_rand_fixed_sum(n, u)
+    periods = np.random.choice(choices, size=utilizations.shape)
+    return periods, utilizations * periods
+
+
+def tasks_from_arrays(periods: np.ndarray, wcets: np.ndarray) -> List[dict]:
+    return [
+        {
+            "period": period,
+            "deadline": period,
+            "activation_date": 0,
+            "proportion": 0.5,
+            "wcet": wcet,
+        }
+        for period, wcet in zip(periods.tolist(), wcets.tolist())
+    ]
@@ -0,0 +1,85 @@
+import random
+import unittest
+
+import numpy as np
+
+from ..analysis import entropy, entropy2, entropy2_vectorized, entropy_intervals, entropy_vectorized
+
+
+def random_schedule(processors, hyperperiods, hyperperiod_len, tasks, idle_processors=0):
+    data = []
+    for pi in range(processors):
+        data.append([])
+        for _ in range(hyperperiods):
+            if pi < idle_processors:
+                data[-1].append([0] * hyperperiod_len)
+            else:
+                data[-1].append([random.randint(0, tasks) for _ in range(hyperperiod_len)])
+    return data
+
+
+def random_executions(processors, duration, tasks):
+    executions = []
+    for _ in range(processors):
+        executions.append([])
+        t = random.randint(0, 5)
+        while t < duration:
+            end = min(duration, t + random.randint(0, 30))
+            executions[-1].append((t, end, random.randint(1, tasks)))
+            t = end + random.randint(0, 5)
+    return executions
+
+
+def into_grid(executions, hyperperiods, hyperperiod_len):
+    data = []
+    for processor in executions:
+        slots = [0] * (hyperperiods * hyperperiod_len)
+        for start, end, task in processor:
+            slots[start:end] = [task] * (end - start)
+        data.append([slots[k * hyperperiod_len:(k + 1) * hyperperiod_len] for k in range(hyperperiods)])
+    return data
+
+
+class EntropyTest(unittest.TestCase):
+    def test_vectorized_matches_entropy(self):
+        random.seed(0)
+        for processors, hyperperiods, hyperperiod_len, tasks, idle in [
+            (1, 10, 20, 3, 0),
+            (4, 7, 15, 9, 1),
+            (3, 5, 10, 1, 2),
+        ]:
+            data = random_schedule(processors, hyperperiods, hyperperiod_len, tasks, idle)
+            expected = entropy(data, tasks, processors, hyperperiods, hyperperiod_len)
+            got = entropy_vectorized(np.array(data), tasks)
+            self.assertAlmostEqual(expected, got, places=9)
+
+    def test_vectorized_idle_schedule(self):
+        self.assertEqual(entropy_vectorized(np.zeros((2, 3, 4), dtype=np.int32), 5), 0.0)
+
+    def test_intervals_match_entropy(self):
+        random.seed(1)
+        for processors, hyperperiods, hyperperiod_len, tasks in [(1, 10, 20, 3), (4, 8, 25, 12), (3, 30, 10, 5)]:
+            executions = random_executions(processors, hyperperiods * hyperperiod_len, tasks)
+            expected = entropy(into_grid(executions, hyperperiods, hyperperiod_len), tasks, processors, hyperperiods, hyperperiod_len)
+            got = entropy_intervals(executions, tasks, hyperperiods, hyperperiod_len)
+            self.assertAlmostEqual(expected, got, places=9)
+
+    def test_intervals_all_empty(self):
+        self.assertIsNone(entropy_intervals([[(0, 5, 1)], []], 1, 2, 10))
+        self.assertIsNotNone(entropy_intervals([[(0, 5, 1)], [(15, 16, 1)]], 1, 2, 10))
+
+    def test_entropy2_vectorized_matches_entropy2(self):
+        random.seed(2)
+        for hyperperiods, hyperperiod_len, tasks in [(8, 40, 3), (6, 20, 1)]:
+            data = random_schedule(1, hyperperiods, hyperperiod_len, tasks)
+            expected = entropy2(data, tasks, hyperperiods, hyperperiod_len)
+            self.assertAlmostEqual(entropy2_vectorized(np.array(data)), expected, places=9)
+
+        # processors that never ran are left out of the average
+        data = random_schedule(3, 8, 40, 3, idle_processors=1)
+        expected = sum(entropy2([data[pi]], 3, 8, 40) for pi in (1, 2)) / 2
+        self.assertAlmostEqual(entropy2_vectorized(np.array(data)), expected, places=9)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,82 @@
+import random
+import time
+from typing import List, Tuple
+
+import numpy as np
+
+from src.entropy.case_gen import gen_tasks
+from src.schedulers.RUN_definitions import _Server
+from src.schedulers.registry import SCHEDULERS
+from src.simso.model_builder import ACETModelBuilder
+
+# (server, instant, deadline) of every `_Server.add_deadline` call, servers are numbered as they first get one
+Deadlines = List[Tuple[int, int, int]]
+
+
+def record_deadlines(processors: int, duration=1000, seed=0) -> Tuple[float, Deadlines, int]:
+    """
+    Simulates RUN_RANDOM on a random taskset using 90% of the processors and records the deadlines given to its
+    servers. Returns the time the simulation took, the deadlines and the amount of servers.
+    """
+    random.seed(seed)
+    np.random.seed(seed)
+    builder = ACETModelBuilder()
+    builder.set_trace_only()
+    for _ in range(processors):
+        builder.add_cpu()
+    for task in gen_tasks(random.randint(processors + 2, 3 * processors), 0.9 * processors):
+        builder.add_task(**task)
+    builder.set_duration(duration)
+    builder.set_scheduler(clas=SCHEDULERS["RUN_RANDOM"])
+    model = builder.build()
+
+    deadlines: Deadlines = []
+    servers = {}
+    add_deadline = _Server.add_deadline
+
+    def recording_add_deadline(server, current_instant, deadline):
+        deadlines.append((servers.setdefault(server.identifier, len(servers)), current_instant, deadline))
+        add_deadline(server, current_instant, deadline)
+
+    _Server.add_deadline = recording_add_deadline  # type: ignore
+    try:
+        start = time.perf_counter()
+        model.run_model()
+        elapsed = time.perf_counter() - start
+    finally:
+        _Server.add_deadline = add_deadline  # type: ignore
+    return elapsed, deadlines, len(servers)
+
+
+def replay(deadlines: Deadlines, servers: int) -> List[int]:
+    """
+    Gives the recorded deadlines to new servers, returns the next deadline after every call.
+    """
+    replayed = [_Server(False, 1) for _ in range(servers)]
+    next_deadlines = []
+    for server, instant, deadline in deadlines:
+        replayed[server].add_deadline(instant, deadline)
+        next_deadlines.append(replayed[server].next_deadline)
+    return next_deadlines
+
+
+def replay_reference(deadlines: Deadlines, servers: int) -> List[int]:
+    """
+    `replay` with the pending deadlines in a list filtered on every call, as the servers used to keep them.
+    """
+    pending = [[0] for _ in range(servers)]
+    next_deadlines = []
+    for server, instant, deadline in deadlines:
+        pending[server].append(deadline)
+        pending[server] = [d for d in pending[server] if d > instant]
+        next_deadlines.append(min(pending[server]))
+    return next_deadlines
+
+
+def entrypoint(processors: int):
+    elapsed, deadlines, servers = record_deadlines(processors)
+    print(f"RUN_RANDOM on {processors} processors: {elapsed:.2f}s, {len(deadlines)} deadlines on {servers} servers")
+    for name, f in [("heap", replay), ("list", replay_reference)]:
+        start = time.perf_counter()
+        f(deadlines, servers)
+        print(f"Replayed with the {name}: {time.perf_counter() - start:.4f}s")
@@ -14,10 +14,13 @@ from simso.schedulers import scheduler
 from src.schedulers.RUN_definitions import (
     TaskServer,
     DualServer,
-    delta_t,
+    SlackEngine,
     EDFServer,
     get_child_tasks,
-    select_jobs,
+    pack_servers,
+    utilization_unit,
+    BEST_FIT,
+    ReductionTree,
     add_job,
 )
 
@@ -41,15 +44,18 @@ class FG_RUN(Scheduler):
         self.task_to_subsystem = {}  # map: Task -> SubSystem
         self.Tdummy = []
 
+        # Utilizations are integers over this unit.
+        self.unit = utilization_unit(self.task_list)
+
         # Create the Task Servers. Those are the leaves of the reduction tree.
-        list_servers = [TaskServer(task) for task in self.task_list]
+        list_servers = [TaskServer(task, self.unit) for task in self.task_list]
 
         # map: Task -> TaskServer. Used to quickly find the servers to update.
         self.servers = dict(zip(self.task_list, list_servers))
 
         assert sum([s.utilization for s in list_servers]) <= len(
             self.processors
-        ), "Load exceeds 100%!"
+        ) * self.unit, "Load exceeds 100%!"
 
         # Instantiate the reduction tree and the various sub-systems.
         self.reduce_iterations(list_servers)
@@ -63,21 +69,21 @@ class FG_RUN(Scheduler):
         # pylint: disable-msg=C0103
         IdleTask = namedtuple("IdleTask", ["utilization", "deadline", "name"])
 
-        idle = len(self.processors) - sum([s.utilization for s in servers])
+        idle = len(self.processors) * self.unit - sum([s.utilization for s in servers])
         for server in servers:
-            if server.utilization < 1 and idle > 0:
-                task = IdleTask(min(1 - server.utilization, idle), 0, "IdleTask")
-                t = TaskServer(task)
+            if server.utilization < self.unit and idle > 0:
+                task = IdleTask(min(self.unit - server.utilization, idle), 0, "IdleTask")
+                t = TaskServer(task, self.unit)
                 self.Tdummy.append(t)
                 t.dummyServer = True
                 dummy.append(t)
                 server.add_child(t)
                 idle -= task.utilization
         while idle > 0:
-            task = IdleTask(min(1, idle), 0, "IdleTask")
-            t = TaskServer(task)
-            server = EDFServer()
-            server.add_child(TaskServer(task))
+            task = IdleTask(min(self.unit, idle), 0, "IdleTask")
+            t = TaskServer(task, self.unit)
+            server = EDFServer(self.unit)
+            server.add_child(TaskServer(task, self.unit))
             idle -= task.utilization
             servers.append(server)
 
@@ -92,7 +98,7 @@ class FG_RUN(Scheduler):
 
         while subsystem_utilization > 0:
             cpus.append(self.available_cpus.pop())
-            subsystem_utilization -= 1
+            subsystem_utilization -= self.unit
 
         subsystem = ProperSubsystem(self.sim, server, cpus, level)
         for server in tasks_servers:
@@ -105,9 +111,9 @@ class FG_RUN(Scheduler):
         instead.
         """
         for server in servers:
-            if server.utilization == 1:
+            if server.utilization == self.unit:
                 self.add_subsystem(server, level)
-        servers[:] = [s for s in servers if s.utilization < 1]
+        servers[:] = [s for s in servers if s.utilization < self.unit]
 
     def reduce_iterations(self, servers):
         """
@@ -182,6 +188,9 @@ class ProperSubsystem(object):
     def __init__(self, sim, root, processors, level):
         self.sim = sim
         self.root = root
+        self.unit = root.unit
+        self.tree = ReductionTree(root)
+        self.slack = SlackEngine()
         self.processors = processors
         self.level = level
         self.virtual = []
@@ -269,13 +278,13 @@ class ProperSubsystem(object):
 
         if self.is_idle is True:
             # delta = omega
-            delta = delta_t(self.utilization, servers, t, t)
+            delta = self.slack.delta(self.utilization, servers, t, t)
 
             if delta > 0:
                 self.idleEnd = t + delta
                 self.busyBegin = self.idleEnd
-                self.busyEnd = self.idleBegin + (self.idleEnd - self.idleBegin) / float(
-                    1 - self.utilization
+                self.busyEnd = self.idleBegin + (self.idleEnd - self.idleBegin) / (
+                    (self.unit - self.utilization) / self.unit
                 )
             else:
                 self.idleEnd = t
@@ -286,13 +295,13 @@ class ProperSubsystem(object):
                 self.busyEnd = max(t + beta, self.busyEnd)
             else:
                 # v = omega_t(servers, t, self.root.next_deadline)
-                v = delta_t(self.utilization, servers, t, self.root.next_deadline)
+                v = self.slack.delta(self.utilization, servers, t, self.root.next_deadline)
 
                 self.idleBegin = t
                 self.idleEnd = self.root.next_deadline + v
                 self.busyBegin = self.idleEnd
                 self.busyEnd = self.root.next_deadline + (
-                    v / float(1 - self.utilization)
+                    v / ((self.unit - self.utilization) / self.unit)
                 )
 
     def schedule(self):
@@ -318,7 +327,7 @@ class ProperSubsystem(object):
         else:
             self.is_idle = False
 
-        selected = select_jobs(self, self.root, self.virtual)
+        selected = self.tree.select_jobs(self.virtual, self.is_idle)
 
         idle = [s for s in selected if s.task.name == "IdleTask"]
         jobs = [
@@ -369,27 +378,4 @@ def pack_BFD(servers):
     """
     Best-Fit with servers inversely sorted by their utilization.
     """
-    return pack_BF(sorted(servers, key=lambda x: x.utilization, reverse=True))
-
-
-def pack_BF(servers):
-    """
-    Create a list of EDF Servers by packing servers. Best-Fit
-    packing algorithm.
-    """
-
-    # Find packed servers if there is one (EDFServer)
-    packed_servers = []  # [s for s in servers if s is EDFServer()]
-    for server in servers:
-        # Try to place the item in the fullest bin that will accommodate it, i.e., the one that will leave the least space remaining
-        packed_servers.sort(key=lambda x: x.utilization, reverse=True)
-        for p_server in packed_servers:
-            if p_server.utilization + server.utilization <= 1:
-                p_server.add_child(server)
-                break
-        else:
-            p_server = EDFServer()
-            p_server.add_child(server)
-            packed_servers.append(p_server)
-
-    return packed_servers
+    return pack_servers(servers, BEST_FIT, decreasing=True)
@@ -9,8 +9,8 @@ tasks with implicit deadlines.
 
 import random
 from simso.core import Scheduler, Timer
-from simso.schedulers.RUNServer import EDFServer, TaskServer, DualServer, \
-    add_job, get_child_tasks
+from src.schedulers.RUN_definitions import DUAL, EDF, TASK, EDFServer, TaskServer, DualServer, \
+    FIRST_FIT, ReductionTree, add_job, get_child_tasks, pack_servers, utilization_unit
 from simso.schedulers import scheduler
 
 @scheduler("src.schedulers.RUN_RANDOM")
@@ -30,14 +30,17 @@ class RUN_RANDOM(Scheduler):
         self.available_cpus = self.processors[:]  # Not yet affected cpus.
         self.task_to_subsystem = {}  # map: Task -> SubSystem
 
+        # Utilizations are integers over this unit.
+        self.unit = utilization_unit(self.task_list)
+
         # Create the Task Servers. Those are the leaves of the reduction tree.
-        list_servers = [TaskServer(task) for task in self.task_list]
+        list_servers = [TaskServer(task, self.unit) for task in self.task_list]
 
         # map: Task -> TaskServer. Used to quickly find the servers to update.
         self.servers = dict(zip(self.task_list, list_servers))
 
         assert (sum([s.utilization for s in list_servers])
-                <= len(self.processors)), "Load exceeds 100%!"
+                <= len(self.processors) * self.unit), "Load exceeds 100%!"
 
         # Instantiate the reduction tree and the various sub-systems.
         self.reduce_iterations(list_servers)
@@ -50,16 +53,16 @@ class RUN_RANDOM(Scheduler):
         # pylint: disable-msg=C0103
         IdleTask = namedtuple('IdleTask', ['utilization'])
 
-        idle = len(self.processors) - sum([s.utilization for s in servers])
+        idle = len(self.processors) * self.unit - sum([s.utilization for s in servers])
         for server in servers:
-            if server.utilization < 1 and idle > 0:
-                task = IdleTask(min(1 - server.utilization, idle))
-                server.add_child(TaskServer(task))
+            if server.utilization < self.unit and idle > 0:
+                task = IdleTask(min(self.unit - server.utilization, idle))
+                server.add_child(TaskServer(task, self.unit))
                 idle -= task.utilization
         while idle > 0:
-            task = IdleTask(min(1, idle))
-            server = EDFServer()
-            server.add_child(TaskServer(task))
+            task = IdleTask(min(self.unit, idle))
+            server = EDFServer(self.unit)
+            server.add_child(TaskServer(task, self.unit))
             idle -= task.utilization
             servers.append(server)
 
@@ -72,7 +75,7 @@ class RUN_RANDOM(Scheduler):
         cpus = []
         while subsystem_utilization > 0:
             cpus.append(self.available_cpus.pop())
-            subsystem_utilization -= 1
+            subsystem_utilization -= self.unit
 
         subsystem = ProperSubsystem(self.sim, server, cpus)
         for server in tasks_servers:
@@ -85,9 +88,9 @@ class RUN_RANDOM(Scheduler):
         instead.
         """
         for server in servers:
-            if server.utilization == 1:
+            if server.utilization == self.unit:
                 self.add_proper_subsystem(server)
-        servers[:] = [s for s in servers if s.utilization < 1]
+        servers[:] = [s for s in servers if s.utilization < self.unit]
 
     def reduce_iterations(self, servers):
         """
@@ -137,18 +140,7 @@ def pack(servers):
     First-Fit but the original article states they used a Worst-Fit packing
     algorithm. According to the article, a First-Fit should also work.
     """
-    packed_servers = []
-    for server in servers:
-        for p_server in packed_servers:
-            if p_server.utilization + server.utilization <= 1:
-                p_server.add_child(server)
-                break
-        else:
-            p_server = EDFServer()
-            p_server.add_child(server)
-            packed_servers.append(p_server)
-
-    return packed_servers
+    return pack_servers(servers, FIRST_FIT)
 
 
 def dual(servers):
@@ -167,6 +159,7 @@ class ProperSubsystem(object):
     def __init__(self, sim, root, processors):
         self.sim = sim
         self.root = root
+        self.tree = ReductionTree(root)
         self.processors = processors
         self.virtual = []
         self.last_update = 0
@@ -237,7 +230,7 @@ class ProperSubsystem(object):
         # print("scheduling at", self.sim.now(), slack)
 
         self.virtual = []
-        jobs = select_jobs(self.root, self.virtual, True, True, False, slack)
+        jobs = select_jobs(self.tree, self.virtual, slack)
 
         wakeup_delay = min(self.virtual, key=lambda s: s.budget).budget
         if wakeup_delay > 0:
@@ -277,40 +270,48 @@ class ProperSubsystem(object):
 
         return decision
 
-def select_jobs(server, virtual, execute, first, is_randomized, slack):
+def select_jobs(tree, virtual, slack):
     """
-    Select the jobs that should run according to RUN. The virtual jobs are
-    appended to the virtual list passed as argument.
+    Select the jobs that should run according to RUN, as (job, is_randomized) in the order of the tree. When the
+    slack allows it the root runs a random active child, or nothing which is selected as (None, True). The virtual
+    jobs are appended to the virtual list passed as argument.
     """
+    servers = tree.servers
+    kinds = tree.kinds
+    children = tree.children
+    execute = [False] * len(servers)
+    execute[0] = True
+    randomized = [False] * len(servers)
     jobs = []
-    if execute:
-        virtual.append(server)
+    for i, server in enumerate(servers):
+        kind = kinds[i]
+        if kind == DUAL:
+            child = children[i][0]
+            execute[child] = not execute[i]
+            randomized[child] = randomized[i]
+        if not execute[i]:
+            continue
 
-    if server.task:
-        if execute and server.budget > 0 and server.job.is_active():
-            jobs.append((server.job, is_randomized))
-    else:
-        if server.is_dual:
-            jobs += select_jobs(server.child, virtual, not execute, False, is_randomized, slack)
-        else:
-            active_servers = [s for s in server.children if s.budget > 0]
-            min_server = None
-            is_randomized = False
+        virtual.append(server)
+        if kind == TASK:
+            if server.budget > 0 and server.job.is_active():
+                jobs.append((server.job, randomized[i]))
+        elif kind == EDF:
+            active_servers = [c for c in children[i] if servers[c].budget > 0]
             if active_servers:
-                min_server = min(active_servers, key=lambda s: s.next_deadline)
+                min_server = min(active_servers, key=lambda c: servers[c].next_deadline)
                 # jobs that are too small will just cause a lot of context switches for no reason
                 # this should probably be sim.cycles_per_ms instead of static 10k
-                if first and slack > 10000:
-                    min_server = None
+                if i == 0 and slack > 10000:
+                    min_server = -1
                     min_server_idx = random.randint(0, len(active_servers)) # able to choose len which means no job
                     if min_server_idx < len(active_servers):
                         min_server = active_servers[min_server_idx]
                     else:
                         jobs.append((None, True))
-                    is_randomized = True
-
-            for child in server.children:
-                jobs += select_jobs(child, virtual,
-                                    execute and child is min_server, False, is_randomized, slack)
+                    for child in children[i]:
+                        randomized[child] = True
+                if min_server >= 0:
+                    execute[min_server] = True
 
     return jobs
@@ -1,6 +1,35 @@
+import bisect
+import heapq
+import math
 from fractions import Fraction
 
 INFINITO = 9000000000000
+# delta_t gives no slack above this utilization, as the exact ratio of the float
+MAX_SLACK_UTILIZATION = (0.95).as_integer_ratio()
+
+
+def utilization_unit(tasks):
+    """
+    Denominator shared by the utilizations of the servers built from the tasks: they're kept as integers over it, so
+    they're added and compared exactly with int operations and a unit server has `utilization == unit`.
+    It's the lcm of the denominators of the task utilizations, a divisor of the hyperperiod when the wcets are
+    integers (float wcets are exact binary fractions, their power of two is added).
+    """
+    unit = 1
+    for task in tasks:
+        denominator = (Fraction(task.wcet) / Fraction(task.period)).denominator
+        unit = unit * denominator // math.gcd(unit, denominator)
+    return unit
+
+
+def scaled(utilization, unit, duration):
+    """
+    `utilization / unit * duration` truncated as with a Fraction utilization: exact for an int duration and in
+    floats otherwise, durations are never negative.
+    """
+    if isinstance(duration, int):
+        return utilization * duration // unit
+    return int(utilization / unit * duration)
 
 
 class _Server(object):
@@ -8,16 +37,25 @@ class _Server(object):
     Abstract class that represents a Server.
     """
 
+    __slots__ = (
+        "parent", "is_dual", "utilization", "unit", "task", "job", "deadlines", "periodicity", "periodicity_key",
+        "budget", "next_deadline", "last_release", "dummyServer", "identifier",
+    )
     next_id = 1
 
-    def __init__(self, is_dual, task=None):
+    def __init__(self, is_dual, unit, task=None):
         self.parent = None
         self.is_dual = is_dual
-        self.utilization = Fraction(0, 1)
+        # numerator over unit, see utilization_unit
+        self.utilization = 0
+        self.unit = unit
         self.task = task
         self.job = None
+        # min-heap of the pending deadlines, the expired ones are dropped once they reach the top
         self.deadlines = [0]
-        self.periodicity = []
+        self.periodicity = set()
+        # frozen copy of periodicity, the servers with the same one share their deadlines and releases
+        self.periodicity_key = frozenset()
         self.budget = 0
         self.next_deadline = 0
         self.last_release = 0
@@ -27,30 +65,35 @@ class _Server(object):
         _Server.next_id += 1
         if task:
             if hasattr(task, "utilization"):
+                # idle tasks, already scaled
                 self.utilization += task.utilization
             else:
-                self.utilization += Fraction(task.wcet) / Fraction(task.period)
+                utilization = Fraction(task.wcet) / Fraction(task.period) * unit
+                assert utilization.denominator == 1, "The unit doesn't divide the utilization of the task"
+                self.utilization += utilization.numerator
 
     def add_deadline(self, current_instant, deadline):
         """
         Add a deadline to this server.
         """
 
-        self.deadlines.append(deadline)
+        heapq.heappush(self.deadlines, deadline)
 
         # save periodicity of this server
-        if current_instant == 0:
-            self.periodicity.append(deadline)
+        if current_instant == 0 and deadline not in self.periodicity:
+            self.periodicity.add(deadline)
+            self.periodicity_key = frozenset(self.periodicity)
 
-        self.deadlines = [d for d in self.deadlines if d > current_instant]
-        self.next_deadline = min(self.deadlines)
+        while self.deadlines[0] <= current_instant:
+            heapq.heappop(self.deadlines)
+        self.next_deadline = self.deadlines[0]
 
     def create_job(self, sim, current_instant):
         """
         Replenish the budget.
         """
 
-        self.budget = int(self.utilization * (self.next_deadline - current_instant))
+        self.budget = scaled(self.utilization, self.unit, self.next_deadline - current_instant)
 
 
 class TaskServer(_Server):
@@ -58,8 +101,10 @@ class TaskServer(_Server):
     A Task Server is a Server that contains a real Task.
     """
 
-    def __init__(self, task):
-        super(TaskServer, self).__init__(False, task)
+    __slots__ = ("last_cpu",)
+
+    def __init__(self, task, unit):
+        super(TaskServer, self).__init__(False, unit, task)
         self.last_cpu = None
 
 
@@ -68,8 +113,10 @@ class EDFServer(_Server):
     An EDF Server is a Server with multiple children scheduled with EDF.
     """
 
-    def __init__(self):
-        super(EDFServer, self).__init__(False)
+    __slots__ = ("children",)
+
+    def __init__(self, unit):
+        super(EDFServer, self).__init__(False, unit)
         self.children = []
 
     def add_child(self, server):
@@ -86,15 +133,108 @@ class DualServer(_Server):
     A Dual server is the opposite of its child.
     """
 
+    __slots__ = ("child",)
+
     def __init__(self, child):
-        super(DualServer, self).__init__(True)
+        super(DualServer, self).__init__(True, child.unit)
         self.child = child
         child.parent = self
-        self.utilization = 1 - child.utilization
+        self.utilization = child.unit - child.utilization
 
         self.dummyServer = child.dummyServer
 
 
+# packing algorithms of pack_servers
+FIRST_FIT, BEST_FIT, WORST_FIT = "first", "best", "worst"
+
+
+def pack_servers(servers, fit=BEST_FIT, decreasing=False):
+    """
+    Create a list of EDF Servers by packing servers in order, by decreasing utilization if decreasing (ties keep their
+    order). Each server goes to a new EDF Server if it doesn't fit in:
+    - FIRST_FIT: the first EDF Server it fits in.
+    - BEST_FIT: the fullest EDF Server it fits in, the one changed the longest ago on ties. So it's the same as sorting
+      the EDF Servers by decreasing utilization before placing each server and taking the first it fits in, which is
+      also the order they're returned in.
+    - WORST_FIT: the emptiest EDF Server, the first one on ties.
+    Every server is placed in O(log n).
+    """
+    if decreasing:
+        servers = sorted(servers, key=lambda s: s.utilization, reverse=True)
+    if not servers:
+        return []
+    return {
+        FIRST_FIT: _pack_first_fit,
+        BEST_FIT: _pack_best_fit,
+        WORST_FIT: _pack_worst_fit,
+    }[fit](servers, servers[0].unit)
+
+
+def _pack_first_fit(servers, unit):
+    packed = []
+    size = 1
+    while size < len(servers):
+        size *= 2
+    # segment tree of the largest remaining capacity, the leaves of EDF Servers not created yet are empty ones
+    capacity = [unit] * (2 * size)
+    for server in servers:
+        if capacity[1] >= server.utilization:
+            i = 1
+            while i < size:
+                i = 2 * i if capacity[2 * i] >= server.utilization else 2 * i + 1
+            index = i - size
+        else:
+            index = len(packed)
+        if index == len(packed):
+            packed.append(EDFServer(unit))
+        packed[index].add_child(server)
+
+        i = index + size
+        capacity[i] = unit - packed[index].utilization
+        i //= 2
+        while i:
+            capacity[i] = max(capacity[2 * i], capacity[2 * i + 1])
+            i //= 2
+    return packed
+
+
+def _pack_best_fit(servers, unit):
+    packed = []
+    # (-utilization, last change, index) of the EDF Servers, sorted
+    order = []
+    for change, server in enumerate(servers):
+        # the first one with utilization <= unit - server.utilization
+        position = bisect.bisect_left(order, (server.utilization - unit,))
+        if position < len(order):
+            index = order.pop(position)[2]
+        else:
+            index = len(packed)
+            packed.append(EDFServer(unit))
+        packed[index].add_child(server)
+        key = (-packed[index].utilization, change, index)
+        bisect.insort(order, key)
+
+    # they come out sorted as they were before placing the last server, which stays where it was
+    order.remove(key)
+    order.insert(position, key)
+    return [packed[index] for _, _, index in order]
+
+
+def _pack_worst_fit(servers, unit):
+    packed = []
+    # (utilization, index) of the EDF Servers
+    heap = []
+    for server in servers:
+        if heap and heap[0][0] + server.utilization <= unit:
+            index = heapq.heappop(heap)[1]
+        else:
+            index = len(packed)
+            packed.append(EDFServer(unit))
+        packed[index].add_child(server)
+        heapq.heappush(heap, (packed[index].utilization, index))
+    return packed
+
+
 def add_job(sim, job, server):
     """
     Recursively update the deadlines of the parents of server.
@@ -152,7 +292,7 @@ def budget(server, old, t):
     if old == t:
         return server.budget
 
-    return int(server.utilization * (deadline(server, t) - release(server, t)))
+    return scaled(server.utilization, server.unit, deadline(server, t) - release(server, t))
 
 
 def get_child_tasks(server):
@@ -171,97 +311,229 @@ def get_child_tasks(server):
             return tasks
 
 
-def select_jobs(self, server, virtual, execute=True):
-    """
-    Select the jobs that should run according to RUN. The virtual jobs are
-    appended to the virtual list passed as argument.
-    """
-    jobs = []
-    if execute:
-        virtual.append(server)
+# kinds of the nodes of a ReductionTree
+TASK, DUAL, EDF = 0, 1, 2
 
-    # Leaves
-    if server.task:
-        # self.sim.logger.log("server {}, budget {}, next_deadline {}".format(server.identifier, server.budget, server.next_deadline))
-        if execute and server.budget > 0:
-
-            # select a dummy job
-            if server.job is None:
-                jobs.append(server)
-                # self.sim.logger.log("SELEECT dummy".format())
-            # select a real job
-            elif server.job.is_active():
-                jobs.append(server)
-                # self.sim.logger.log("SELEECT {}".format(server.identifier))
 
-    else:
-        # Rule 2
-        if server.is_dual:
-            # if execute:
-            # self.sim.logger.log("DualServer{}: BUDGET = {}, deadline = {}".format(server.identifier, server.budget, server.next_deadline))
-            jobs += select_jobs(self, server.child, virtual, not execute)
-        # Rule 1
-        else:
-            active_servers = [s for s in server.children if s.budget > 0]
-            if active_servers:
-                min_server = min(active_servers, key=lambda s: s.next_deadline)
+class ReductionTree(object):
+    """
+    The reduction tree under the root of a proper sub-system, flattened in preorder (a parent is always before its
+    children) so the online part is iterative passes over arrays: the kind and children indices of every node.
+    The budgets and deadlines stay on the servers, `add_job` updates them through the parents.
+    The tree must be complete when it's built, the reduction never changes it afterwards.
+    """
 
-                if self.is_idle and server == self.root:
-                    min_server = [s for s in active_servers if s.dummyServer][0]
+    __slots__ = ("servers", "kinds", "children")
 
-                # if min_server.dummyServer and server == self.root:
-                #    self.is_idle = True
+    def __init__(self, root):
+        self.servers = []
+        self.kinds = []
+        self.children = []
+        stack = [(root, -1)]
+        while stack:
+            server, parent = stack.pop()
+            index = len(self.servers)
+            self.servers.append(server)
+            self.children.append([])
+            if parent >= 0:
+                self.children[parent].append(index)
+            if server.task:
+                self.kinds.append(TASK)
+            elif server.is_dual:
+                self.kinds.append(DUAL)
+                stack.append((server.child, index))
             else:
-                min_server = None
+                self.kinds.append(EDF)
+                stack.extend((child, index) for child in reversed(server.children))
 
-            for child in server.children:
-                jobs += select_jobs(
-                    self, child, virtual, execute and child is min_server
-                )
-    return jobs
+    def select_jobs(self, virtual, idle=False):
+        """
+        Select the task servers that should run according to RUN, in preorder. The executing servers are
+        appended to the virtual list passed as argument. When idle, the root selects its dummy server.
+        """
+        servers = self.servers
+        kinds = self.kinds
+        children = self.children
+        execute = [False] * len(servers)
+        execute[0] = True
+        selected = []
+        for i, server in enumerate(servers):
+            if not execute[i]:
+                # only the child of a dual server can execute under a server that doesn't
+                if kinds[i] == DUAL:
+                    execute[children[i][0]] = True
+                continue
+
+            virtual.append(server)
+            kind = kinds[i]
+            if kind == TASK:
+                # select a dummy job or a real job
+                if server.budget > 0 and (server.job is None or server.job.is_active()):
+                    selected.append(server)
+            # Rule 1, the active child with the earliest deadline executes
+            elif kind == EDF:
+                min_child = -1
+                for c in children[i]:
+                    child = servers[c]
+                    if child.budget > 0 and (min_child < 0 or child.next_deadline < servers[min_child].next_deadline):
+                        min_child = c
+                if min_child >= 0 and idle and i == 0:
+                    min_child = next(c for c in children[i] if servers[c].budget > 0 and servers[c].dummyServer)
+                if min_child >= 0:
+                    execute[min_child] = True
+            # Rule 2, the child of an executing dual server doesn't execute: it's left False
+        return selected
 
 
 def delta_t(u, servers, old, t):
-    # self.sim.logger.log("delta_t".format())
-
-    # servers = update_times(self, servers)
-
-    # servers = [s for s in servers if s.utilization > 0]
-
-    if not servers or u > 0.95:
-        return 0
-
-    servers.sort(key=lambda s: deadline(s, t), reverse=False)
-
-    """for s in servers:
-        self.sim.logger.log("id={}, release {}, next_deadline {}, budget = {}".format(s.identifier, release(self, s, t),deadline(self, s, t), budget(self, s, old, t)))
     """
+    Slack of the servers at `t`, see `SlackEngine`. A proper sub-system keeps its own engine between calls instead.
+    """
+    return SlackEngine().delta(u, servers, old, t)
 
-    # get the biggest deadline
-    delta = deadline(servers[len(servers) - 1], t) - t
-    # delta = servers[len(servers)-1].next_deadline
 
-    # self.sim.logger.log("start delta = {}".format(delta))
+class SlackEngine(object):
+    """
+    Slack of the servers of a proper sub-system, the minimum of `float_slack` over their deadlines, only evaluated where
+    `exact_slacks` is within `float_error` of the minimum. Keeps the server order and the deadlines and releases.
+    """
 
-    for j in range(0, len(servers)):
+    def __init__(self):
+        # servers sorted by deadline at the last call
+        self.order = []
+        # current instant of the cached deadlines and releases
+        self.now = None
+        # (periodicity, instant) -> deadline or release of the servers with that periodicity
+        self.deadlines = {}
+        self.releases = {}
+
+    def deadline(self, server, t):
+        if not server.periodicity:
+            return server.next_deadline
+        key = (server.periodicity_key, t)
+        if key not in self.deadlines:
+            self.deadlines[key] = deadline(server, t)
+        return self.deadlines[key]
+
+    def release(self, server, t):
+        if not server.periodicity:
+            return server.last_release
+        key = (server.periodicity_key, t)
+        if key not in self.releases:
+            self.releases[key] = release(server, t)
+        return self.releases[key]
+
+    def budget(self, server, old, t):
+        if old == t or self.release(server, t) == self.release(server, old):
+            return server.budget
+        return scaled(server.utilization, server.unit, self.deadline(server, t) - self.release(server, t))
+
+    def delta(self, u, servers, old, t):
+        """
+        Slack of the servers at `t` when the current instant is `old`, `servers` is sorted by deadline.
+        O(n log n) plus O(log n) per release change for the exact slacks, and O(j) per candidate j, so O(n^2) at worst.
+        """
+        if not servers or u * MAX_SLACK_UTILIZATION[1] > MAX_SLACK_UTILIZATION[0] * servers[0].unit:
+            return 0
 
-        d = deadline(servers[j], t)
+        if old != self.now:
+            self.now = old
+            self.deadlines.clear()
+            self.releases.clear()
+
+        # sorted as a stable sort of `servers`, starting from the last order it's almost sorted already
+        positions = {s: k for k, s in enumerate(servers)}
+        order = [s for s in self.order if s in positions]
+        if len(order) < len(servers):
+            kept = set(order)
+            order += [s for s in servers if s not in kept]
+        deadlines = {s: self.deadline(s, t) for s in servers}
+        order.sort(key=lambda s: (deadlines[s], positions[s]))
+        servers[:] = order
+        self.order = order
+
+        budgets = [self.budget(s, old, t) for s in servers]
+
+        # get the biggest deadline
+        delta = deadlines[servers[-1]] - t
+
+        candidates = range(len(servers))
+        exact = self.exact_slacks(servers, deadlines, budgets, t)
+        if exact is not None:
+            slacks, error = exact
+            least = min(slacks)
+            candidates = [j for j, slack in enumerate(slacks) if slack - error <= least + error]
+
+        for j in candidates:
+            delta = min(delta, self.float_slack(servers, deadlines, budgets, t, j))
+            if delta <= 0:
+                return 0
+
+        return int(delta)
+
+    def float_slack(self, servers, deadlines, budgets, t, j):
+        """
+        Slack up to the deadline dj of the j-th sorted server, in floats. O(j).
+        """
+        d = deadlines[servers[j]]
         c = 0
-        # self.sim.logger.log("j = {}, dj = {}, t = {}".format(servers[j].identifier, d, t))
-        # self.sim.logger.log("---------".format())
         for i in range(0, j + 1):
+            ri = deadlines[servers[i]]
+            di = self.release(servers[i], d)
+            c = c + budgets[i] + float(di - ri) * (servers[i].utilization / servers[i].unit)
+        return d - t - c
 
-            ri = deadline(servers[i], t)  # D(self, servers[i], t)
-            di = release(servers[i], d)  # R(self, servers[i], d, t)
-            # self.sim.logger.log("i = {}, dj = {}, ri = {}, di = {}".format(servers[i].identifier, d, ri, di))
+    def exact_slacks(self, servers, deadlines, budgets, t):
+        """
+        `float_slack` of every sorted server exactly, scaled by the unit, and `float_error`, None unless the instants
+        and budgets are integers below 2^52. The releases of the periodicities advance from a heap of their deadlines.
+        """
+        unit = servers[0].unit
+        values = [t, *budgets, *deadlines.values(), *(s.last_release for s in servers if not s.periodicity)]
+        if not all(float(v).is_integer() and abs(v) < 2 ** 52 for v in values):
+            return None
+
+        # periodicity -> [a server with it, utilization of its servers so far, release at dj]
+        groups = {}
+        # (instant the release of a periodicity changes, its index, periodicity)
+        changes = []
+        budget_sum = 0
+        # sum of (release at dj - deadline) * utilization
+        demand = 0
+        slacks = []
+        for server, b in zip(servers, budgets):
+            d = deadlines[server]
+            while changes and changes[0][0] <= d:
+                _, index, key = heapq.heappop(changes)
+                group = groups[key]
+                r = int(self.release(group[0], d))
+                demand += (r - group[2]) * group[1]
+                group[2] = r
+                heapq.heappush(changes, (self.deadline(group[0], d), index, key))
+
+            budget_sum += int(b)
+            demand -= int(d) * server.utilization
+            if server.periodicity:
+                key = server.periodicity_key
+                if key not in groups:
+                    groups[key] = [server, 0, int(self.release(server, d))]
+                    heapq.heappush(changes, (self.deadline(server, d), len(groups), key))
+                groups[key][1] += server.utilization
+                demand += groups[key][2] * server.utilization
+            else:
+                demand += int(server.last_release) * server.utilization
+            slacks.append(int(d - t - budget_sum) * unit - demand)
 
-            c = c + budget(servers[i], old, t) + float(di - ri) * servers[i].utilization
-            # self.sim.logger.log("c = {}, ci = {}, eita = {}, u = {}".format(c, budget(self, servers[i], old, t), float(di - ri)*servers[i].utilization, servers[i].utilization))
-            # self.sim.logger.log("---------".format())
+        return slacks, self.float_error(budgets, max(abs(v) for v in values), unit)
 
-        delta = min(delta, (d - t - c))
-        # self.sim.logger.log("delta = {}, dj-t-c = {}".format(delta, (d - t - c)))
-        if delta <= 0:
-            return 0
-
-    return int(delta)
+    @staticmethod
+    def float_error(budgets, largest, unit):
+        """
+        Bound of |float_slack - exact slack| scaled by the unit, gamma(2n + 4) (sum |b| + (n + 1) X) for the largest
+        instant X and gamma(k) = k 2^-53 / (1 - k 2^-53), see Higham, Accuracy and Stability of Numerical Algorithms.
+        """
+        # every term of c has 2 roundings, summing the 2(j + 1) terms adds 2j + 1 and dj - t - c one more, the
+        # utilizations are at most the unit so a term is at most X
+        n = len(budgets)
+        gamma = Fraction(2 * n + 4, 2 ** 53 - (2 * n + 4))
+        return math.ceil(gamma * (sum(abs(int(b)) for b in budgets) + (n + 1) * int(largest)) * unit)
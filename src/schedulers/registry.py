@@ -0,0 +1,21 @@
+"""
+Schedulers the results are generated with, in the order they're run and stored.
+They're imported once and given to simso by class, so it doesn't load them from a file on every model build.
+"""
+from typing import Dict, FrozenSet
+
+from simso.schedulers.P_EDF import P_EDF
+from simso.schedulers.RUN import RUN
+
+from src.schedulers.P_REORDER import P_REORDER
+from src.schedulers.RUN_RANDOM import RUN_RANDOM
+
+SCHEDULERS: Dict[str, type] = {
+    "P_EDF": P_EDF,
+    "RUN": RUN,
+    "P_REORDER": P_REORDER,
+    "RUN_RANDOM": RUN_RANDOM,
+}
+
+# schedulers that take no random decision, their schedule repeats once the system is back to its initial state
+DETERMINISTIC: FrozenSet[type] = frozenset({P_EDF, RUN})
@@ -0,0 +1,263 @@
+import random
+import unittest
+from fractions import Fraction
+
+from ..RUN_definitions import (
+    BEST_FIT, FIRST_FIT, WORST_FIT, DualServer, EDFServer, ReductionTree, TaskServer, _Server, SlackEngine, budget,
+    deadline, delta_t, pack_servers, release, scaled, utilization_unit,
+)
+from ..RUN_RANDOM import select_jobs as select_random_jobs
+
+
+class SampleTask:
+    def __init__(self, wcet, period):
+        self.wcet = wcet
+        self.period = period
+
+
+def pack_reference(servers, fit):
+    """
+    Packing by scanning the EDF Servers for every server, best-fit sorts them first as pack_BF did.
+    """
+    packed = []
+    for server in servers:
+        if fit == BEST_FIT:
+            packed.sort(key=lambda x: x.utilization, reverse=True)
+        candidates = packed if fit != WORST_FIT else sorted(packed, key=lambda x: x.utilization)[:1]
+        for p_server in candidates:
+            if p_server.utilization + server.utilization <= server.unit:
+                p_server.add_child(server)
+                break
+        else:
+            p_server = EDFServer(server.unit)
+            p_server.add_child(server)
+            packed.append(p_server)
+    return packed
+
+
+def delta_t_reference(u, servers, old, t):
+    """
+    delta_t as the doubly nested loop calling deadline, release and budget for every pair of servers.
+    """
+    if not servers or u > 0.95 * servers[0].unit:
+        return 0
+    servers = sorted(servers, key=lambda s: deadline(s, t))
+    delta = deadline(servers[-1], t) - t
+    for j in range(len(servers)):
+        d = deadline(servers[j], t)
+        c = 0
+        for i in range(j + 1):
+            ri = deadline(servers[i], t)
+            di = release(servers[i], d)
+            c = c + budget(servers[i], old, t) + float(di - ri) * (servers[i].utilization / servers[i].unit)
+        delta = min(delta, d - t - c)
+        if delta <= 0:
+            return 0
+    return int(delta)
+
+
+class SampleJob:
+    def __init__(self, active):
+        self.active = active
+
+    def is_active(self):
+        return self.active
+
+
+def random_tree(depth):
+    """
+    Reduction tree with random budgets, deadlines (with ties) and dummy servers.
+    """
+    kind = random.random() if depth else 0
+    if kind < 0.3:
+        server = TaskServer(SampleTask(1, 2), 2)
+        server.job = SampleJob(random.random() < 0.8)
+    elif kind < 0.5:
+        server = DualServer(random_tree(depth - 1))
+    else:
+        server = EDFServer(2)
+        for _ in range(random.randint(1, 4)):
+            server.add_child(random_tree(depth - 1))
+    server.budget = random.choice([0, 5, 10])
+    server.next_deadline = random.choice([10, 20, 30])
+    server.dummyServer = random.random() < 0.3
+    return server
+
+
+def select_jobs_reference(server, virtual, root, idle, execute=True):
+    """
+    RUN's selection as the recursion over the servers the reduction tree flattens.
+    """
+    jobs = []
+    if execute:
+        virtual.append(server)
+    if server.task:
+        if execute and server.budget > 0 and (server.job is None or server.job.is_active()):
+            jobs.append(server)
+    elif server.is_dual:
+        jobs += select_jobs_reference(server.child, virtual, root, idle, not execute)
+    else:
+        active_servers = [s for s in server.children if s.budget > 0]
+        min_server = None
+        if active_servers:
+            min_server = min(active_servers, key=lambda s: s.next_deadline)
+            if idle and server is root:
+                min_server = [s for s in active_servers if s.dummyServer][0]
+        for child in server.children:
+            jobs += select_jobs_reference(child, virtual, root, idle, execute and child is min_server)
+    return jobs
+
+
+def select_random_jobs_reference(server, virtual, execute, first, is_randomized, slack):
+    """
+    RUN_RANDOM's selection as the recursion over the servers the reduction tree flattens.
+    """
+    jobs = []
+    if execute:
+        virtual.append(server)
+    if server.task:
+        if execute and server.budget > 0 and server.job.is_active():
+            jobs.append((server.job, is_randomized))
+    elif server.is_dual:
+        jobs += select_random_jobs_reference(server.child, virtual, not execute, False, is_randomized, slack)
+    else:
+        active_servers = [s for s in server.children if s.budget > 0]
+        min_server = None
+        is_randomized = False
+        if active_servers:
+            min_server = min(active_servers, key=lambda s: s.next_deadline)
+            if first and slack > 10000:
+                min_server = None
+                min_server_idx = random.randint(0, len(active_servers))
+                if min_server_idx < len(active_servers):
+                    min_server = active_servers[min_server_idx]
+                else:
+                    jobs.append((None, True))
+                is_randomized = True
+        for child in server.children:
+            jobs += select_random_jobs_reference(
+                child, virtual, execute and child is min_server, False, is_randomized, slack
+            )
+    return jobs
+
+
+class RUNDefinitionsTest(unittest.TestCase):
+    def test_pack_matches_reference(self):
+        random.seed(0)
+        for _ in range(50):
+            # coarse utilizations so there are ties
+            tasks = [SampleTask(random.randint(1, 12), 12) for _ in range(random.randint(1, 60))]
+            unit = utilization_unit(tasks)
+            for fit in [FIRST_FIT, BEST_FIT, WORST_FIT]:
+                servers = sorted([TaskServer(task, unit) for task in tasks], key=lambda s: s.utilization, reverse=True)
+                expected = [[tasks.index(c.task) for c in p.children] for p in pack_reference(servers, fit)]
+                servers = [TaskServer(task, unit) for task in tasks]
+                got = [[tasks.index(c.task) for c in p.children] for p in pack_servers(servers, fit, decreasing=True)]
+                self.assertEqual(got, expected, fit)
+
+    def test_scaled_utilization_matches_fraction(self):
+        random.seed(0)
+        tasks = [SampleTask(random.uniform(0.1, 0.9) * p, p) for p in [10, 20, 25, 50, 100, 200]]
+        tasks.append(SampleTask(3, 7))
+        unit = utilization_unit(tasks)
+        for task in tasks:
+            utilization = Fraction(task.wcet) / Fraction(task.period)
+            server = DualServer(TaskServer(task, unit))
+            self.assertEqual(Fraction(server.utilization, unit), 1 - utilization)
+            for duration in [0, 1, 997, 10**9 + 7, 1234.5, 1e9 / 3]:
+                self.assertEqual(scaled(server.utilization, unit, duration), int((1 - utilization) * duration))
+
+        # a unit server is detected exactly
+        tasks = [SampleTask(1, 3), SampleTask(1, 6), SampleTask(0.5, 1)]
+        unit = utilization_unit(tasks)
+        server = EDFServer(unit)
+        for task in tasks:
+            server.add_child(TaskServer(task, unit))
+        self.assertEqual(server.utilization, unit)
+
+    def test_delta_matches_reference(self):
+        random.seed(0)
+        cycles = 10**6
+        # shared by every case as a sub-system shares it between its calls
+        engine = SlackEngine()
+        for k in range(300):
+            # integer wcets make exact ties between the slack and an integer, float ones make rounding errors
+            wcet = random.randint if k % 2 else random.uniform
+            tasks = [SampleTask(wcet(1, 4), random.choice([20, 25, 50, 100])) for _ in range(random.randint(1, 12))]
+            unit = utilization_unit(tasks)
+            servers = []
+            for task in tasks:
+                server = TaskServer(task, unit) if random.random() < 0.9 else DualServer(TaskServer(task, unit))
+                for period in random.sample([10, 20, 25, 50, 100], random.randint(0, 3)):
+                    server.add_deadline(0, float(period * cycles))
+                server.next_deadline = float(random.randint(1, 10) * 10 * cycles)
+                server.last_release = random.randint(0, 10) * 10 * cycles
+                server.budget = random.randint(0, cycles)
+                servers.append(server)
+            now = random.randint(0, 100) * cycles // 4
+            u = sum(s.utilization for s in servers) % unit
+            for old, t in [(now, now), (now, now + random.randint(1, 50) * cycles)]:
+                expected = delta_t_reference(u, servers, old, t)
+                self.assertEqual(delta_t(u, list(servers), old, t), expected)
+                self.assertEqual(engine.delta(u, list(servers), old, t), expected)
+
+                # the exact slacks and the bound of the float error of every deadline
+                ordered = sorted(servers, key=lambda s: deadline(s, t))
+                deadlines = {s: deadline(s, t) for s in ordered}
+                budgets = [budget(s, old, t) for s in ordered]
+                slacks, error = engine.exact_slacks(ordered, deadlines, budgets, t)
+                for j, server in enumerate(ordered):
+                    d = deadlines[server]
+                    slack = Fraction(d) - t - sum(
+                        b + Fraction(release(s, d) - deadlines[s]) * Fraction(s.utilization, unit)
+                        for s, b in zip(ordered[:j + 1], budgets)
+                    )
+                    self.assertEqual(slacks[j], slack * unit)
+                    computed = engine.float_slack(ordered, deadlines, budgets, t, j)
+                    self.assertLessEqual(abs(Fraction(computed) - slack) * unit, error)
+
+    def test_tree_selection_matches_recursion(self):
+        random.seed(0)
+        for k in range(300):
+            root = EDFServer(2)
+            for _ in range(random.randint(1, 4)):
+                root.add_child(random_tree(random.randint(0, 5)))
+            tree = ReductionTree(root)
+            # idle needs an active dummy server under the root
+            idle = random.random() < 0.5 and any(c.budget > 0 and c.dummyServer for c in root.children)
+
+            virtual, expected_virtual = [], []
+            selected = tree.select_jobs(virtual, idle)
+            self.assertEqual(selected, select_jobs_reference(root, expected_virtual, root, idle))
+            self.assertEqual(virtual, expected_virtual)
+
+            slack = random.choice([0, 20000])
+            random.seed(k)
+            virtual = []
+            selected = select_random_jobs(tree, virtual, slack)
+            random.seed(k)
+            expected_virtual = []
+            self.assertEqual(selected, select_random_jobs_reference(root, expected_virtual, True, True, False, slack))
+            self.assertEqual(virtual, expected_virtual)
+
+    def test_deadline_heap_matches_list(self):
+        random.seed(0)
+        server = _Server(False, 1)
+        # the pending deadlines as a list filtered on every call
+        pending = [0]
+        periodicity = set()
+        instant = 0
+        for _ in range(500):
+            # several deadlines at the same instant, some of them repeated
+            instant += random.choice([0, 0, 1, 5])
+            deadline = instant + random.randint(1, 20)
+            server.add_deadline(instant, deadline)
+            pending = [d for d in pending + [deadline] if d > instant]
+            if instant == 0:
+                periodicity.add(deadline)
+            self.assertEqual(server.next_deadline, min(pending))
+        self.assertEqual(server.periodicity, periodicity)
+
+
+if __name__ == "__main__":
+    unittest.main()
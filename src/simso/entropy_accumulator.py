@@ -0,0 +1,129 @@
+from typing import Dict, List, Optional, Tuple
+
+from simso.core import Model, Timer
+
+from src.entropy.analysis import HYPERPERIOD_LEN, K, SlotFrequencies
+from src.simso.trace import RunIntervalMonitor
+
+
+class EntropyAccumulator:
+    """
+    Online counterpart of `SimData` + `entropy_intervals`: the slot frequencies are updated as the processors
+    run, so the entropy is ready when the simulation ends and the processor monitors keep no history.
+    Listens to the `RunIntervalMonitor`s of a trace only model, must be constructed after the model is built and
+    before it runs.
+    With record_executions the monitors also keep the (start, end, task) intervals, as `SimData.processor_executions`
+    would.
+    Each (hyperperiod_amount, hyperperiod_len) in resolutions gets its own frequencies, fed with the same
+    intervals cut at its duration, so several configurations come out of a single simulation.
+    """
+
+    def __init__(self, model: Model, task_amount: int, hyperperiod_amount=K, hyperperiod_len=HYPERPERIOD_LEN, record_executions=False, resolutions: Optional[List[Tuple[int, int]]] = None):
+        self.model = model
+        self.resolutions = {
+            resolution: SlotFrequencies(task_amount, len(model.processors), *resolution)
+            for resolution in resolutions or []
+        }
+        self.frequencies = SlotFrequencies(task_amount, len(model.processors), hyperperiod_amount, hyperperiod_len)
+        self.monitors: List[RunIntervalMonitor] = []
+        for processor in model.processors:
+            assert isinstance(processor.monitor, RunIntervalMonitor), "The model must be trace only"
+            processor.monitor.record(record_executions)
+            processor.monitor.listeners.append(self.add)
+            self.monitors.append(processor.monitor)
+        self.record_executions = record_executions
+
+    def add(self, processor: int, start: int, end: int, task: int):
+        """
+        Adds the execution of task on processor during [start, end) ms.
+        """
+        self.frequencies.add(processor, start, end, task)
+        for frequencies in self.resolutions.values():
+            frequencies.add(processor, start, min(end, frequencies.duration), task)
+
+    def snapshot(self, frequencies: Optional[SlotFrequencies] = None) -> SlotFrequencies:
+        """
+        Slot frequencies up to now, executions still in progress are cut at the current instant.
+        Defaults to the main frequencies, the ones of a resolution can be given instead.
+        """
+        if frequencies is None:
+            frequencies = self.frequencies
+        frequencies = frequencies.copy()
+        c = self.model.cycles_per_ms
+        for processor, monitor in enumerate(self.monitors):
+            if monitor.running is not None:
+                start, task = monitor.running
+                frequencies.add(processor, start // c, min(self.model.now() // c, frequencies.duration), task)
+        return frequencies
+
+    def executions(self) -> List[List[Tuple[int, int, int]]]:
+        """
+        The recorded processor executions, executions still in progress are cut at the current instant.
+        """
+        assert self.record_executions, "Executions are not being recorded"
+        return [monitor.executions() for monitor in self.monitors]
+
+    def simulated_hyperperiods(self, hyperperiod_len: Optional[int] = None) -> int:
+        """
+        Amount of complete hyperperiods simulated so far.
+        """
+        if hyperperiod_len is None:
+            hyperperiod_len = self.frequencies.hyperperiod_len
+        return self.model.now() // self.model.cycles_per_ms // hyperperiod_len
+
+    def entropy(self) -> Optional[float]:
+        """
+        Entropy of the hyperperiods simulated so far, None if all processors are empty.
+        """
+        return self._entropy(self.frequencies, extrapolate=True)
+
+    def resolution_entropies(self) -> Dict[Tuple[int, int], Optional[float]]:
+        """
+        Entropy of each (hyperperiod_amount, hyperperiod_len) resolution, None if all processors are empty on it or
+        if it's longer than what was simulated.
+        """
+        return {
+            resolution: self._entropy(frequencies, extrapolate=False)
+            for resolution, frequencies in self.resolutions.items()
+        }
+
+    def _entropy(self, frequencies: SlotFrequencies, extrapolate: bool) -> Optional[float]:
+        frequencies = self.snapshot(frequencies)
+        simulated = self.simulated_hyperperiods(frequencies.hyperperiod_len)
+        if simulated < frequencies.hyperperiod_amount:
+            if not extrapolate or simulated == 0:
+                return None
+            frequencies.hyperperiod_amount = simulated
+        if frequencies.all_empty():
+            return None
+        return frequencies.entropy()
+
+
+class ConvergenceStop:
+    """
+    Checks the running entropy of the accumulator at every hyperperiod boundary and stops the simulation once it
+    changed less than tolerance (relative to its value) since the previous boundary, after at least min_hyperperiods.
+    The model must be an `ACETModel`, the check timer can only start once the simulation is initialized.
+    """
+
+    def __init__(self, accumulator: EntropyAccumulator, tolerance: float, min_hyperperiods: int):
+        self.accumulator = accumulator
+        self.tolerance = tolerance
+        self.min_hyperperiods = min_hyperperiods
+        self.last_entropy: Optional[float] = None
+        model = accumulator.model
+        self.timer = Timer(model, ConvergenceStop.check, (self,), accumulator.frequencies.hyperperiod_len, one_shot=False)
+        model.on_start.append(self.timer.start)  # type: ignore
+
+    def check(self):
+        hyperperiods = self.accumulator.simulated_hyperperiods()
+        current = self.accumulator.entropy()
+        converged = (
+            current is not None
+            and self.last_entropy is not None
+            and abs(current - self.last_entropy) <= self.tolerance * current
+        )
+        self.last_entropy = current
+        if hyperperiods >= self.min_hyperperiods and converged:
+            self.timer.stop()
+            self.accumulator.model.stopSimulation()
@@ -1,14 +1,76 @@
+import copy
+from typing import Callable, List, Optional
+
 from simso.configuration import Configuration
 from simso.core import Model
+from simso.core.Scheduler import SchedulerInfo
+
+from src.simso.trace import MissCounter, trace_monitors
+
+
+class ACETModel(Model):
+    """
+    Model that runs the on_start callbacks once the simulation is initialized, timers started before that are dropped.
+    A trace only model keeps no events, only the processor executions and the amount of missed deadlines
+    (see `src.simso.trace`), `results` then sees no events and `deadline_misses` has to be used instead.
+    """
+
+    def __init__(self, configuration, callback=None, trace_only=False):
+        # initialize is already called by the constructor
+        self.on_start: List[Callable[[], None]] = []
+        Model.__init__(self, configuration, callback)
+        self.misses: Optional[MissCounter] = trace_monitors(self) if trace_only else None
+
+    def initialize(self):
+        Model.initialize(self)
+        for f in self.on_start:
+            f()
+
+    def deadline_misses(self) -> int:
+        if self.misses is not None:
+            return self.misses.count
+        return self.results.total_exceeded_count  # type: ignore
+
 
 class ACETModelBuilder:
+    """
+    Builds the model of a taskset. A builder can be frozen once its tasks and CPUs are added, validating them once,
+    and cloned for every scheduler, the clones share the task and CPU infos and are built without validation.
+    """
     def __init__(self):
         self.config = Configuration()
         self.config.etm = "wcet"
         self.cur_task_id = 1
         self.cur_cpu_id = 1
+        self.frozen = False
+        self.trace_only = False
+
+    def freeze(self) -> "ACETModelBuilder":
+        """
+        Validates everything but the scheduler and forbids adding tasks or CPUs.
+        """
+        self.config.check_general()
+        self.config.check_processors()
+        self.config.check_tasks()
+        self.config.check_caches()
+        self.frozen = True
+        return self
+
+    def clone(self, duration: Optional[int] = None, **scheduler) -> "ACETModelBuilder":
+        """
+        Copy of a frozen builder with the given scheduler (as `set_scheduler` takes it) and duration.
+        """
+        assert self.frozen, "Only frozen builders can be cloned"
+        builder = copy.copy(self)
+        builder.config = copy.copy(self.config)
+        builder.config._scheduler_info = SchedulerInfo()
+        builder.set_scheduler(**scheduler)
+        if duration is not None:
+            builder.set_duration(duration)
+        return builder
 
     def add_task(self, **kwargs):
+        assert not self.frozen, "Can't add tasks to a frozen builder"
         self.config.add_task(
             name=f"task_{self.cur_task_id}",
             identifier=self.cur_task_id,
@@ -25,15 +87,25 @@ class ACETModelBuilder:
         self.config.duration = duration * self.config.cycles_per_ms
 
     def add_cpu(self):
+        assert not self.frozen, "Can't add CPUs to a frozen builder"
         self.config.add_processor(
             name=f"cpu_{self.cur_cpu_id}", identifier=self.cur_cpu_id
         )
         self.cur_cpu_id += 1
 
+    def set_trace_only(self, trace_only=True):
+        """
+        Builds trace only models, that keep only the processor executions and the amount of missed deadlines.
+        """
+        self.trace_only = trace_only
+
     def set_scheduler(self, **kwargs):
         self.config.scheduler_info.clas = kwargs.get("clas")  # type: ignore
         self.config.scheduler_info.filename = kwargs.get("filename")  # type: ignore
 
-    def build(self) -> Model:
+    def build(self) -> ACETModel:
+        if self.frozen:
+            # the scheduler is checked when the model instantiates it
+            return ACETModel(self.config, trace_only=self.trace_only)
         self.config.check_all()
-        return Model(self.config)
+        return ACETModel(self.config, trace_only=self.trace_only)
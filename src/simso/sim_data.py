@@ -1,6 +1,10 @@
+from typing import List, Optional, Tuple
+
+import numpy as np
 from simso.core import Model, ProcEvent
 
 from src.entropy.analysis import K
+from src.simso.trace import RunIntervalMonitor
 
 
 class SimData:
@@ -12,6 +16,11 @@ class SimData:
         c = model.cycles_per_ms
         self.processor_executions = []
         for processor in model.processors:
+            if isinstance(processor.monitor, RunIntervalMonitor):
+                # trace only model, the executions are already extracted
+                self.processor_executions.append(processor.monitor.executions())
+                continue
+
             last_task = None
             computed = []
             for evt in processor.monitor:
@@ -69,3 +78,39 @@ class SimData:
             print("All processors are empty, skipping invalid taskset")
             return None
         return executions
+
+    def into_array(self, hyperperiod_len: int, hyperperiod_amount=None) -> Optional[np.ndarray]:
+        """
+        Same as `into_hyperperiods` but returns a dense array of shape (processors, hyperperiods, hyperperiod_len).
+        """
+        return into_array(self.processor_executions, hyperperiod_len, hyperperiod_amount)
+
+
+def into_array(processor_executions: List[List[Tuple[int, int, int]]], hyperperiod_len: int, hyperperiod_amount=None) -> Optional[np.ndarray]:
+    """
+    Builds the dense schedule array (processors, hyperperiods, hyperperiod_len) from the processor executions,
+    None if all processors are empty.
+    """
+    if hyperperiod_amount is None:
+        hyperperiod_amount = K
+
+    executions = np.zeros((len(processor_executions), hyperperiod_amount * hyperperiod_len), dtype=np.int32)
+    all_empty = True
+    for pi, processor in enumerate(processor_executions):
+        hyperperiods = 0
+        assert sorted(processor, key=lambda x: x[0]) == processor, "Processor not sorted"
+        for start, end, task in processor:
+            assert end - start + 1 <= hyperperiod_len, "Hyperperiod too short"
+            if start == end:
+                continue
+            hyperperiods = max(hyperperiods, (end - 1) // hyperperiod_len + 1)
+            executions[pi, start:end] = task
+
+        assert hyperperiods <= hyperperiod_amount, f"Expected {hyperperiod_amount} hyperperiods, got {hyperperiods}"
+        if hyperperiods == hyperperiod_amount:
+            all_empty = False
+
+    if all_empty:
+        print("All processors are empty, skipping invalid taskset")
+        return None
+    return executions.reshape(-1, hyperperiod_amount, hyperperiod_len)
@@ -0,0 +1,72 @@
+import unittest
+
+from src.entropy.analysis import entropy_intervals
+from ..entropy_accumulator import ConvergenceStop, EntropyAccumulator
+from ..model_builder import ACETModelBuilder
+from ..sim_data import SimData
+
+TASKS = [
+    {"period": 5, "deadline": 5, "activation_date": 0, "proportion": 0.5, "wcet": 2},
+    {"period": 10, "deadline": 10, "activation_date": 0, "proportion": 0.5, "wcet": 4},
+    {"period": 20, "deadline": 20, "activation_date": 0, "proportion": 0.5, "wcet": 7},
+    {"period": 10, "deadline": 10, "activation_date": 0, "proportion": 0.5, "wcet": 5},
+]
+
+
+def build_model():
+    builder = ACETModelBuilder()
+    builder.set_trace_only()
+    for _ in range(2):
+        builder.add_cpu()
+    for task in TASKS:
+        builder.add_task(**task)
+    builder.set_duration(100)
+    builder.set_scheduler(clas="simso.schedulers.P_EDF")
+    return builder.build()
+
+
+class EntropyAccumulatorTest(unittest.TestCase):
+    def test_matches_sim_data(self):
+        model = build_model()
+        model.run_model()
+        expected = entropy_intervals(SimData(model).processor_executions, len(TASKS), 5, 20)
+
+        model = build_model()
+        accumulator = EntropyAccumulator(model, len(TASKS), 5, 20)
+        model.run_model()
+
+        self.assertAlmostEqual(accumulator.entropy(), expected, places=9)
+        self.assertTrue(all(len(processor.monitor) == 0 for processor in model.processors))
+
+    def test_resolutions_match_shorter_traces(self):
+        model = build_model()
+        model.run_model()
+        executions = SimData(model).processor_executions
+
+        model = build_model()
+        accumulator = EntropyAccumulator(model, len(TASKS), 5, 20, resolutions=[(2, 20), (10, 10)])
+        model.run_model()
+        entropies = accumulator.resolution_entropies()
+
+        clipped = [[(start, min(end, 40), task) for start, end, task in p if start < 40] for p in executions]
+        self.assertAlmostEqual(entropies[(2, 20)], entropy_intervals(clipped, len(TASKS), 2, 20), places=9)
+        self.assertAlmostEqual(entropies[(10, 10)], entropy_intervals(executions, len(TASKS), 10, 10), places=9)
+
+    def test_converged_stops_after_min_hyperperiods(self):
+        model = build_model()
+        accumulator = EntropyAccumulator(model, len(TASKS), 5, 20)
+        model.run_model()
+        expected = accumulator.entropy()
+
+        # the schedule repeats, so the entropy doesn't change between hyperperiods
+        model = build_model()
+        accumulator = EntropyAccumulator(model, len(TASKS), 5, 20)
+        ConvergenceStop(accumulator, 1e-9, 3)
+        model.run_model()
+
+        self.assertEqual(accumulator.simulated_hyperperiods(), 3)
+        self.assertAlmostEqual(accumulator.entropy(), expected, places=9)
+
+
+if __name__ == "__main__":
+    unittest.main()
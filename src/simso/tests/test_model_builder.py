@@ -0,0 +1,32 @@
+import unittest
+
+from ..model_builder import ACETModelBuilder
+from ..sim_data import SimData
+from .test_entropy_accumulator import TASKS, build_model
+
+
+class ModelBuilderTest(unittest.TestCase):
+    def test_clone_matches_build(self):
+        base = ACETModelBuilder()
+        for _ in range(2):
+            base.add_cpu()
+        for task in TASKS:
+            base.add_task(**task)
+        base.freeze()
+        with self.assertRaises(AssertionError):
+            base.add_task(**TASKS[0])
+
+        model = build_model()
+        model.run_model()
+        for scheduler in ["simso.schedulers.P_EDF", "simso.schedulers.RUN"]:
+            clone = base.clone(100, clas=scheduler).build()
+            clone.run_model()
+            self.assertEqual(clone.scheduler.__class__.__name__, scheduler.split(".")[-1])
+        # running the other clones didn't change the base
+        clone = base.clone(100, clas="simso.schedulers.P_EDF").build()
+        clone.run_model()
+        self.assertEqual(SimData(clone).processor_executions, SimData(model).processor_executions)
+
+
+if __name__ == "__main__":
+    unittest.main()
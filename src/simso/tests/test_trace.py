@@ -0,0 +1,45 @@
+import unittest
+
+from ..model_builder import ACETModelBuilder
+from ..sim_data import SimData
+from ..trace import RunIntervals
+from .test_entropy_accumulator import TASKS
+
+
+def build_model(cpus, scheduler, trace_only):
+    builder = ACETModelBuilder()
+    builder.set_trace_only(trace_only)
+    for _ in range(cpus):
+        builder.add_cpu()
+    for task in TASKS:
+        builder.add_task(**task)
+    builder.set_duration(100)
+    builder.set_scheduler(clas=scheduler)
+    return builder.build()
+
+
+class TraceTest(unittest.TestCase):
+    def test_matches_full_model(self):
+        # the tasks don't fit on a single CPU, global EDF misses deadlines there
+        for cpus, scheduler in [(2, "simso.schedulers.P_EDF"), (1, "simso.schedulers.EDF")]:
+            full = build_model(cpus, scheduler, False)
+            full.run_model()
+            trace = build_model(cpus, scheduler, True)
+            trace.run_model()
+
+            self.assertEqual(SimData(trace).processor_executions, SimData(full).processor_executions)
+            self.assertEqual(trace.deadline_misses(), full.results.total_exceeded_count)
+            self.assertTrue(all(len(task.monitor) == 0 for task in trace.task_list))
+            self.assertEqual(len(trace.logs), 0)
+        self.assertGreater(trace.deadline_misses(), 0)
+
+    def test_run_intervals_grow(self):
+        intervals = RunIntervals(capacity=2)
+        for k in range(5):
+            intervals.append(k, k + 1, k % 2)
+        self.assertEqual(len(intervals), 5)
+        self.assertEqual(intervals.tolist(), [(k, k + 1, k % 2) for k in range(5)])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,115 @@
+from typing import Callable, List, Optional, Tuple
+
+import numpy as np
+from SimPy.Simulation import Monitor
+from simso.core import JobEvent, Model, ProcEvent
+
+
+class NullMonitor(Monitor):
+    """
+    Monitor that drops everything it observes.
+    """
+
+    def observe(self, y, t=None):
+        pass
+
+
+class MissCounter(NullMonitor):
+    """
+    Stands in for the task monitors, only counts the jobs that missed their deadline, as
+    `Results.total_exceeded_count` would.
+    """
+
+    def __init__(self, model: Model):
+        NullMonitor.__init__(self, name="MissCounter", sim=model)
+        self.count = 0
+
+    def observe(self, y, t=None):
+        if y.event == JobEvent.ABORTED or (y.event == JobEvent.TERMINATED and y.job.exceeded_deadline):
+            self.count += 1
+
+
+class RunIntervals:
+    """
+    (start, end, task) intervals of a processor in a preallocated array, its capacity is doubled when it's full.
+    """
+
+    def __init__(self, capacity=256):
+        self.data = np.empty((capacity, 3), dtype=np.int64)
+        self.size = 0
+
+    def append(self, start: int, end: int, task: int):
+        if self.size == len(self.data):
+            self.data = np.concatenate([self.data, np.empty_like(self.data)])
+        self.data[self.size] = (start, end, task)
+        self.size += 1
+
+    def __len__(self):
+        return self.size
+
+    def tolist(self) -> List[Tuple[int, int, int]]:
+        return [tuple(interval) for interval in self.data[:self.size].tolist()]
+
+
+class RunIntervalMonitor(NullMonitor):
+    """
+    Stands in for a processor monitor, only keeps the executions (in ms) as `SimData` would extract them.
+    The listeners get every execution as it ends, they can stand in for the recording (see `record`).
+    """
+
+    def __init__(self, model: Model, processor: int):
+        NullMonitor.__init__(self, name=f"RunIntervalMonitor{processor}", sim=model)
+        self.processor = processor
+        self.intervals: Optional[RunIntervals] = RunIntervals()
+        # (start, task) of the execution in progress
+        self.running = None
+        # called with (processor, start, end, task) of every execution
+        self.listeners: List[Callable[[int, int, int, int], None]] = []
+
+    def record(self, record: bool):
+        """
+        Keeps the executions or only passes them to the listeners, before the simulation starts.
+        """
+        self.intervals = RunIntervals() if record else None
+
+    def observe(self, y, t=None):
+        if y.event == ProcEvent.RUN:
+            assert self.running is None
+            self.running = (self.sim.now() if t is None else t, y.args.task.identifier)
+        elif y.event == ProcEvent.OVERHEAD and self.running is not None:
+            start, task = self.running
+            c = self.sim.cycles_per_ms
+            start, end = start // c, (self.sim.now() if t is None else t) // c
+            if self.intervals is not None:
+                self.intervals.append(start, end, task)
+            for listener in self.listeners:
+                listener(self.processor, start, end, task)
+            self.running = None
+
+    def executions(self) -> List[Tuple[int, int, int]]:
+        """
+        The recorded executions, the one still in progress is cut at the current instant.
+        """
+        assert self.intervals is not None, "Executions are not being recorded"
+        executions = self.intervals.tolist()
+        if self.running is not None:
+            start, task = self.running
+            c = self.sim.cycles_per_ms
+            executions.append((start // c, self.sim.now() // c, task))
+        return executions
+
+
+def trace_monitors(model: Model) -> MissCounter:
+    """
+    Replaces every monitor of a built model (processors, timers, tasks, scheduler and logs) so only the processor
+    executions and the amount of missed deadlines are kept, returns the counter of missed deadlines.
+    """
+    model.logger._logs = NullMonitor(name="Logs", sim=model)
+    model.scheduler.monitor = NullMonitor(name="MonitorScheduler", sim=model)
+    misses = MissCounter(model)
+    for task in model.task_list:
+        task._monitor = misses
+    for pi, processor in enumerate(model.processors):
+        processor.monitor = RunIntervalMonitor(model, pi)
+        processor.timer_monitor = NullMonitor(name=f"MonitorTimer{pi}", sim=model)
+    return misses